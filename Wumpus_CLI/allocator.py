@@ -0,0 +1,77 @@
+"""Free-slot allocator. Used to place dangers and entities in empty slots
+(culverts or tiles) in constant time, no matter how full the board is.
+
+Both games keep the same copy of this module, so that either folder runs on
+its own. The GUI's doctest checks that the copies do not drift apart."""
+
+import random
+from array import array
+
+
+class NoFreeSlot(Exception):
+    """Raised when there is no free slot left to place something in."""
+
+
+class Allocator:
+    """Keeps all free slots, numbered 0 to size - 1, in a list. A slot is picked
+    by choosing a random entry and swapping it with the last one before it is
+    removed, so every operation takes constant time and the picks are uniform."""
+    def __init__(self, size, rng=random):
+        self.rng = rng
+        self.free = list(range(size))
+        self.position = array('i', range(size))
+
+    def __len__(self):
+        """Returns the number of free slots."""
+        return len(self.free)
+
+    def __contains__(self, slot):
+        """Checks if the slot is free."""
+        return self.position[slot] >= 0
+
+    def _pick(self, exclude):
+        """Returns the list position of a random free slot that is not excluded.
+        Excluded slots are moved to the end of the list and not picked from."""
+        count = len(self.free)
+        for slot in exclude:
+            if slot is not None and self.position[slot] >= 0 and self.position[slot] < count:
+                count -= 1
+                self._swap(self.position[slot], count)
+        if count <= 0:
+            raise NoFreeSlot("No free slot left.")
+        return self.rng.randrange(count)
+
+    def _swap(self, i, j):
+        """Swaps two entries of the free list."""
+        free, position = self.free, self.position
+        free[i], free[j] = free[j], free[i]
+        position[free[i]] = i
+        position[free[j]] = j
+
+    def take(self, exclude=()):
+        """Removes a random free slot and returns it.
+        Raises NoFreeSlot if every slot, except those excluded, is taken."""
+        i = self._pick(exclude)
+        self._swap(i, len(self.free) - 1)
+        slot = self.free.pop()
+        self.position[slot] = -1
+        return slot
+
+    def choose(self, exclude=()):
+        """Returns a random free slot without removing it.
+        Raises NoFreeSlot if every slot, except those excluded, is taken."""
+        return self.free[self._pick(exclude)]
+
+    def remove(self, slot):
+        """Marks the given slot as taken."""
+        i = self.position[slot]
+        if i >= 0:
+            self._swap(i, len(self.free) - 1)
+            self.free.pop()
+            self.position[slot] = -1
+
+    def release(self, slot):
+        """Marks the given slot as free again."""
+        if self.position[slot] < 0:
+            self.position[slot] = len(self.free)
+            self.free.append(slot)
@@ -0,0 +1,162 @@
+"""Difficulty analyzer. Simulates a large number of seeded games per difficulty
+with scripted policies, spread over all cores, and writes a JSON report
+with win rates, causes of loss, move counts and arrow usage. The boards of
+every chunk of games are generated in one batch, and played all at once with
+NumPy, by the batch engine and vectorized versions of the policies."""
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool, cpu_count
+
+from engine import BatchEngine, Move, Shoot, ARROWS
+from board import WUMPUS, derive_seed, generate
+
+LIMIT = 200
+
+
+def random_policy(engine, rng=random):
+    """Shoots into a random adjacent culvert with a chance of one in five every turn,
+    otherwise moves to a random adjacent culvert."""
+    exits = engine.exits
+    if rng.random() < 0.2:
+        return Shoot([rng.choice(exits)])
+    return Move(rng.choice(exits))
+
+
+def cautious_policy(engine, rng=random):
+    """Shoots into a random adjacent culvert when Wumpus can be smelled,
+    otherwise moves to a random adjacent culvert."""
+    if engine.warnings & WUMPUS:
+        return Shoot([rng.choice(engine.exits)])
+    return Move(rng.choice(engine.exits))
+
+
+def random_batch_policy(engine, games, rng):
+    """The random policy for the given games of a BatchEngine."""
+    exits = engine.exits(games)
+    target = exits[range(len(games)), rng.integers(0, exits.shape[1], len(games))]
+    return rng.random(len(games)) < 0.2, target
+
+
+def cautious_batch_policy(engine, games, rng):
+    """The cautious policy for the given games of a BatchEngine."""
+    exits = engine.exits(games)
+    target = exits[range(len(games)), rng.integers(0, exits.shape[1], len(games))]
+    return engine.warnings(games) & WUMPUS != 0, target
+
+
+POLICIES = {'random': random_policy, 'cautious': cautious_policy}
+BATCH_POLICIES = {'random': random_batch_policy, 'cautious': cautious_batch_policy}
+
+
+def simulate(task):
+    """Worker function. Plays the given number of games on one difficulty with one
+    policy. Every chunk has its own batch of boards, and its own streams of rule
+    and policy choices, derived from the seed of the analysis, so it plays the same
+    games whichever worker runs it. Returns the collected counters."""
+    import numpy as np
+    difficulty, policy_name, seed, chunk, games = task
+    policy = partial(BATCH_POLICIES[policy_name], rng=np.random.default_rng(derive_seed(seed, difficulty, chunk, 'policy')))
+    boards = generate(games, difficulty, seed=derive_seed(seed, difficulty, chunk))
+    engine = BatchEngine(boards, difficulty, derive_seed(seed, difficulty, chunk, 'rules'))
+    engine.play(policy, LIMIT)
+
+    outcomes = Counter(cause or 'LIMIT' for cause in engine.causes())
+    moves = Counter(engine.moves.tolist())
+    arrows = Counter(engine.shots.tolist())
+    return difficulty, outcomes, moves, arrows
+
+
+def percentile(histogram, fraction):
+    """Returns the value below which the given fraction of a histogram lies."""
+    total = sum(histogram.values())
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= fraction * total:
+            return value
+    return 0
+
+
+def summarize(outcomes, moves, arrows):
+    """Combines the counters of one difficulty into a report entry."""
+    games = sum(outcomes.values())
+    return {
+        'games': games,
+        'win_rate': outcomes['WIN'] / games if games else 0.0,
+        'outcomes': dict(outcomes),
+        'moves': {
+            'mean': sum(k * v for k, v in moves.items()) / games if games else 0.0,
+            'p50': percentile(moves, 0.5),
+            'p90': percentile(moves, 0.9),
+            'p99': percentile(moves, 0.99),
+            'histogram': {str(k): v for k, v in sorted(moves.items())},
+        },
+        'arrows': {
+            'mean': sum(k * v for k, v in arrows.items()) / games if games else 0.0,
+            'histogram': {str(k): v for k, v in sorted(arrows.items())},
+        },
+    }
+
+
+def analyze(games, difficulties=(1, 2, 3, 4, 5), policy='random', seed=0, workers=None, chunk=10000):
+    """Splits the games of every difficulty into seeded chunks, simulates them in
+    a process pool and returns the report."""
+    tasks = []
+    for difficulty in difficulties:
+        remaining = games
+        while remaining > 0:
+            size = min(chunk, remaining)
+            tasks.append((difficulty, policy, seed, (games - remaining) // chunk, size))
+            remaining -= size
+
+    totals = {d: (Counter(), Counter(), Counter()) for d in difficulties}
+    start = time.perf_counter()
+    with Pool(workers or cpu_count()) as pool:
+        for difficulty, outcomes, moves, arrows in pool.imap_unordered(simulate, tasks):
+            totals[difficulty][0].update(outcomes)
+            totals[difficulty][1].update(moves)
+            totals[difficulty][2].update(arrows)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'policy': policy,
+        'seed': seed,
+        'arrows': ARROWS,
+        'move_limit': LIMIT,
+        'workers': workers or cpu_count(),
+        'seconds': elapsed,
+        'games_per_second': games * len(difficulties) / elapsed if elapsed else 0.0,
+        'difficulties': {str(d): summarize(*totals[d]) for d in difficulties},
+    }
+
+
+def main():
+    """Parses arguments, runs the analysis and writes the report."""
+    parser = argparse.ArgumentParser(description="Simulates games to measure the difficulty levels.")
+    parser.add_argument('-n', '--games', type=int, default=100000, help="games per difficulty")
+    parser.add_argument('-d', '--difficulty', type=int, nargs='+', default=[1, 2, 3, 4, 5])
+    parser.add_argument('-p', '--policy', choices=sorted(POLICIES), default='random')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="processes, default all cores")
+    parser.add_argument('-c', '--chunk', type=int, default=10000, help="games per task")
+    parser.add_argument('-o', '--output', default='report.json')
+    args = parser.parse_args()
+
+    report = analyze(args.games, args.difficulty, args.policy, args.seed, args.workers, args.chunk)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+
+    for difficulty, entry in sorted(report['difficulties'].items()):
+        print("Difficulty {0}: {1:.1%} won, {2:.1f} moves on average".format(
+            difficulty, entry['win_rate'], entry['moves']['mean']))
+    print("{0:.0f} games/s on {1} workers. Report written to {2}".format(
+        report['games_per_second'], report['workers'], args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Compact representation of the culverts. The adjacency is kept in a shared
+Topology and the dangers as one byte per culvert, with a bit for bats, pit
+and Wumpus. A second byte per culvert holds the warnings, the dangers of all
+its neighbors combined."""
+
+import random
+
+from allocator import Allocator, NoFreeSlot
+from topology import DODECAHEDRON
+
+NONE = 0
+BATS = 1
+PIT = 2
+WUMPUS = 4
+DANGERS = BATS | PIT
+
+# Chance (out of 101) that a danger is placed, depending on difficulty.
+CHANCE = {1: 40, 2: 40, 3: 75, 4: 85, 5: 100}
+BATS_RANGE = (3, 6)
+PIT_RANGE = (3, 7)
+
+SEED_BITS = 64
+
+
+def new_seed():
+    """Returns a fresh seed from the operating system's randomness."""
+    return random.SystemRandom().getrandbits(SEED_BITS)
+
+
+def derive_seed(seed, *keys):
+    """Returns a seed derived from another seed and the given keys, e.g. a worker
+    or chunk number. Streams seeded with different keys are independent, and the
+    same seed and keys always give the same stream."""
+    import hashlib
+    digest = hashlib.sha256(repr((seed,) + keys).encode()).digest()
+    return int.from_bytes(digest[:SEED_BITS // 8], 'little')
+
+
+class Positions:
+    """Index of where the entities are, by culvert index. There is one Wumpus
+    and one player, while bats and pits may be in several culverts."""
+    __slots__ = ('wumpus', 'player', 'bats', 'pits')
+
+    def __init__(self):
+        self.wumpus = None
+        self.player = None
+        self.bats = set()
+        self.pits = set()
+
+    def __repr__(self):
+        """For debugging. Returns the positions of all entities."""
+        return "Positions(wumpus={0}, player={1}, bats={2}, pits={3})".format(
+            self.wumpus, self.player, sorted(self.bats), sorted(self.pits))
+
+
+class Board:
+    """Holds the topology, the dangers and the warnings of every culvert.
+    The topology is expected to be symmetric, so the culverts warned by
+    a danger are the neighbors of the culvert it is in. The culverts without
+    bats or pit are kept in a free-slot allocator, and the positions of all
+    entities in a position index."""
+    def __init__(self, topology=DODECAHEDRON, hazards=None, rng=random):
+        self.topology = topology
+        self.neighbors = topology.neighbors
+        self.size = topology.size
+        self.rng = rng
+        self.warnings = bytearray(self.size)
+        self.positions = Positions()
+        self._safe = {}
+        if hazards is None:
+            self.hazards = bytearray(self.size)
+            self.free = Allocator(self.size, rng)
+        else:
+            self.hazards = bytearray(hazards)
+            self.scan()
+            self.allocate()
+
+    def use(self, rng):
+        """Makes all further random placements on the board use the given generator."""
+        self.rng = rng
+        self.free.rng = rng
+
+    def allocate(self):
+        """Rebuilds the allocator of culverts without bats or pit."""
+        self.free = Allocator(self.size, self.rng)
+        for index, hazard in enumerate(self.hazards):
+            if hazard & DANGERS:
+                self.free.remove(index)
+
+    def scan(self):
+        """Computes the warnings and the positions of every culvert from scratch."""
+        hazards, warnings, neighbors = self.hazards, self.warnings, self.neighbors
+        positions = self.positions
+        for index in range(self.size):
+            mask = 0
+            for neighbor in neighbors(index):
+                mask |= hazards[neighbor]
+            warnings[index] = mask
+
+            hazard = hazards[index]
+            if hazard & WUMPUS:
+                positions.wumpus = index
+            if hazard & BATS:
+                positions.bats.add(index)
+            if hazard & PIT:
+                positions.pits.add(index)
+        self._safe.clear()
+
+    def warn(self, index):
+        """The dangers of a culvert have changed. Updates the warnings of its neighbors."""
+        hazards, warnings, neighbors = self.hazards, self.warnings, self.neighbors
+        for neighbor in neighbors(index):
+            mask = 0
+            for culvert in neighbors(neighbor):
+                mask |= hazards[culvert]
+            warnings[neighbor] = mask
+
+    def index(self, index, flag, present):
+        """Updates the position index after a flag has changed in a culvert.
+        Forgets the safe neighbors of culverts next to a changed danger."""
+        positions = self.positions
+        if flag & WUMPUS:
+            if present:
+                positions.wumpus = index
+            elif positions.wumpus == index:
+                positions.wumpus = None
+        if flag & BATS:
+            (positions.bats.add if present else positions.bats.discard)(index)
+        if flag & PIT:
+            (positions.pits.add if present else positions.pits.discard)(index)
+        if flag & DANGERS:
+            for neighbor in self.neighbors(index):
+                self._safe.pop(neighbor, None)
+
+    def set(self, index, flag):
+        """Sets the given danger flag in a culvert."""
+        self.hazards[index] |= flag
+        for neighbor in self.neighbors(index):
+            self.warnings[neighbor] |= flag
+        if flag & DANGERS:
+            self.free.remove(index)
+        self.index(index, flag, True)
+
+    def unset(self, index, flag):
+        """Removes the given danger flag from a culvert."""
+        flag &= self.hazards[index]
+        if flag:
+            self.hazards[index] &= ~flag
+            self.warn(index)
+            if not self.hazards[index] & DANGERS:
+                self.free.release(index)
+            self.index(index, flag, False)
+
+    def move(self, origin, destination, flag):
+        """Moves the given flag from one culvert to another."""
+        self.unset(origin, flag)
+        self.set(destination, flag)
+
+    def safe(self, index):
+        """Returns the neighbors of a culvert that have no bats or pit.
+        Computed once and kept until a danger next to them changes."""
+        try:
+            return self._safe[index]
+        except KeyError:
+            hazards = self.hazards
+            safe = self._safe[index] = tuple([n for n in self.neighbors(index) if not hazards[n] & DANGERS])
+            return safe
+
+    def clear(self, flags=DANGERS):
+        """Removes the given danger flags from all culverts."""
+        table = bytes(i & ~flags for i in range(256))
+        self.hazards[:] = self.hazards.translate(table)
+        self.warnings[:] = self.warnings.translate(table)
+        if flags & DANGERS == DANGERS:
+            self.free = Allocator(self.size, self.rng)
+        elif flags & DANGERS:
+            self.allocate()
+        if flags & DANGERS:
+            self._safe.clear()
+
+        if flags & WUMPUS:
+            self.positions.wumpus = None
+        if flags & BATS:
+            self.positions.bats.clear()
+        if flags & PIT:
+            self.positions.pits.clear()
+
+
+class Boards:
+    """A batch of boards, as generated by 'generate'. Holds the dangers of each board
+    as an array of shape (K, N) and the Wumpus and player positions of shape (K,)."""
+    def __init__(self, hazards, wumpus, player, topology=DODECAHEDRON):
+        self.hazards = hazards
+        self.wumpus = wumpus
+        self.player = player
+        self.topology = topology
+
+    def __len__(self):
+        """Returns the number of boards in the batch."""
+        return len(self.hazards)
+
+    def __getitem__(self, item):
+        """Returns the board with the given number and the player's position on it."""
+        return Board(self.topology, self.hazards[item].tobytes()), int(self.player[item])
+
+
+def generate(count, difficulty=3, seed=None, topology=DODECAHEDRON):
+    """Generates a batch of boards at once with NumPy. Follows the same rules as
+    CSC.initialize_dangers: a number of bats and pits that each are placed with a
+    chance depending on difficulty, never two in the same culvert. Wumpus is placed
+    anywhere and the player in a culvert with no danger and no Wumpus.
+    Raises NoFreeSlot if a cave is too small to leave the player such a culvert."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    size = topology.size
+    chance = CHANCE[difficulty] / 101
+
+    bats = rng.binomial(rng.integers(*BATS_RANGE, size=count), chance)
+    pits = rng.binomial(rng.integers(*PIT_RANGE, size=count), chance)
+    order = np.argsort(rng.random((count, size)), axis=1)
+    rank = np.argsort(order, axis=1)
+
+    hazards = np.zeros((count, size), dtype=np.uint8)
+    hazards[rank < bats[:, None]] = BATS
+    hazards[(rank >= bats[:, None]) & (rank < (bats + pits)[:, None])] = PIT
+
+    wumpus = rng.integers(0, size, size=count)
+    hazards[np.arange(count), wumpus] |= WUMPUS
+
+    rows = np.arange(count)
+    first = bats + pits
+    if np.any(first >= size):
+        raise NoFreeSlot("No free culvert left for the player.")
+    player = order[rows, first]
+    taken = player == wumpus
+    if np.any(first[taken] + 1 >= size):
+        raise NoFreeSlot("No free culvert left for the player.")
+    player[taken] = order[rows[taken], first[taken] + 1]
+
+    return Boards(hazards, wumpus, player, topology)
@@ -0,0 +1,232 @@
+"""Distance oracles. Answer how many culverts apart two culverts are.
+Small caves get a dense table of all pairs, large caves a set of landmarks
+with the distance from each landmark to every culvert, which gives bounds
+right away and guides an exact search when one is needed. Oracles are built
+once per topology and cached on disk, keyed by the topology's digest."""
+
+import os
+from array import array
+
+from modules import ASSET_FOLDER
+
+CACHE_FOLDER = os.path.join(ASSET_FOLDER, "cache/")
+MAGIC = b'WDO2'
+
+# Caves up to this size get a dense N x N table.
+DENSE_LIMIT = 1024
+LANDMARKS = 16
+# The distance between culverts that are not connected.
+UNREACHABLE = None
+TYPECODES = ('B', 'H', 'I', 'L', 'Q')
+
+
+def typecode(size):
+    """Returns the smallest unsigned array type that holds every distance in a
+    cave of the given size, at most size - 1, below its largest value."""
+    for code in TYPECODES:
+        if size <= far(code):
+            return code
+    raise ValueError("A cave of {0} culverts is too large.".format(size))
+
+
+def far(code):
+    """Returns the largest value of an array type. Distance arrays hold it for
+    culverts that can not be reached, it is never a distance."""
+    return (1 << 8 * array(code).itemsize) - 1
+
+
+def bfs(topology, source):
+    """Returns the distance from source to every culvert, as an array of the
+    type given by 'typecode'. Culverts that can not be reached hold 'far'."""
+    offsets, targets = topology.offsets, topology.targets
+    code = typecode(topology.size)
+    unreached = far(code)
+    distances = array(code, [unreached]) * topology.size
+    distances[source] = 0
+    frontier = [source]
+    step = 0
+    while frontier:
+        step += 1
+        following = []
+        for culvert in frontier:
+            for neighbor in targets[offsets[culvert]:offsets[culvert + 1]]:
+                if distances[neighbor] == unreached:
+                    distances[neighbor] = step
+                    following.append(neighbor)
+        frontier = following
+    return distances
+
+
+class DenseOracle:
+    """Distances between all pairs of culverts, one byte each in caves of up
+    to 255 culverts, and as many as it takes to hold any distance in larger ones."""
+    KIND = b'D'
+    name = "dense"
+
+    def __init__(self, topology, table=None):
+        self.topology = topology
+        self.size = topology.size
+        if table is None:
+            table = array(typecode(self.size))
+            for source in range(self.size):
+                table.extend(bfs(topology, source))
+        self.table = table
+        self.far = far(table.typecode)
+
+    def distance(self, a, b):
+        """Returns the number of steps between culvert a and b,
+        UNREACHABLE if they are not connected."""
+        distance = self.table[a * self.size + b]
+        return UNREACHABLE if distance == self.far else distance
+
+    def estimate(self, a, b):
+        """Returns the lowest and highest possible distance. Always exact."""
+        distance = self.distance(a, b)
+        return distance, distance
+
+    def arrays(self):
+        """Returns the arrays to store in the cache."""
+        return [self.table]
+
+
+class LandmarkOracle:
+    """Distances from a few landmark culverts to every culvert. Memory is
+    linear in the size of the cave. Landmarks are picked far from each other,
+    each new one being the culvert farthest from those already picked."""
+    KIND = b'L'
+
+    def __init__(self, topology, count=LANDMARKS, tables=None):
+        self.topology = topology
+        self.size = topology.size
+        self.name = "landmarks{0}".format(count)
+        if tables is None:
+            tables = []
+            nearest = array(typecode(self.size), [far(typecode(self.size))]) * self.size
+            landmark = 0
+            for _ in range(min(count, self.size)):
+                distances = bfs(topology, landmark)
+                tables.append(distances)
+                for i, d in enumerate(distances):
+                    if d < nearest[i]:
+                        nearest[i] = d
+                landmark = max(range(self.size), key=nearest.__getitem__)
+        self.tables = tables
+        self.far = far(tables[0].typecode) if tables else None
+
+    def estimate(self, a, b):
+        """Returns the lowest and highest possible distance between culvert a and b,
+        from the triangle inequality over all landmarks. Both are UNREACHABLE if
+        a landmark reaches only one of them."""
+        low, high = 0, self.size - 1
+        for distances in self.tables:
+            da, db = distances[a], distances[b]
+            if da == self.far or db == self.far:
+                if da != db:
+                    return UNREACHABLE, UNREACHABLE
+                continue
+            low = max(low, abs(da - db))
+            high = min(high, da + db)
+        return low, high
+
+    def distance(self, a, b):
+        """Returns the number of steps between culvert a and b. Searches from both
+        ends at once, and stops early if the landmarks already give the answer."""
+        if a == b:
+            return 0
+        low, high = self.estimate(a, b)
+        if low == high:
+            return low
+
+        offsets, targets = self.topology.offsets, self.topology.targets
+        seen = ({a: 0}, {b: 0})
+        frontiers = ([a], [b])
+        depth = [0, 0]
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            own, other = seen[side], seen[1 - side]
+            depth[side] += 1
+            following = []
+            best = None
+            for culvert in frontiers[side]:
+                for neighbor in targets[offsets[culvert]:offsets[culvert + 1]]:
+                    if neighbor in other:
+                        distance = depth[side] + other[neighbor]
+                        if best is None or distance < best:
+                            best = distance
+                    elif neighbor not in own:
+                        own[neighbor] = depth[side]
+                        following.append(neighbor)
+            if best is not None:
+                return best
+            frontiers[side][:] = following
+        return UNREACHABLE
+
+    def arrays(self):
+        """Returns the arrays to store in the cache."""
+        return self.tables
+
+
+def cache_path(topology, name):
+    """Returns the cache file of an oracle with the given name for a topology."""
+    return os.path.join(CACHE_FOLDER, "distance-{0}-{1}.bin".format(topology.digest(), name))
+
+
+def load(topology, kind, name):
+    """Loads the arrays of a cached oracle, or returns None if there is none."""
+    try:
+        with open(cache_path(topology, name), 'rb') as file:
+            if file.read(4) != MAGIC or file.read(1) != kind:
+                return None
+            count = int.from_bytes(file.read(4), 'little')
+            arrays = []
+            for _ in range(count):
+                typecode = file.read(1).decode()
+                length = int.from_bytes(file.read(8), 'little')
+                data = array(typecode)
+                data.fromfile(file, length)
+                arrays.append(data)
+            return arrays
+    except (IOError, EOFError, ValueError):
+        return None
+
+
+def save(topology, oracle):
+    """Writes the arrays of an oracle to the cache. Failing to do so is not an error."""
+    path = cache_path(topology, oracle.name)
+    try:
+        os.makedirs(CACHE_FOLDER, exist_ok=True)
+        with open(path + ".tmp", 'wb') as file:
+            arrays = oracle.arrays()
+            file.write(MAGIC + oracle.KIND + len(arrays).to_bytes(4, 'little'))
+            for data in arrays:
+                file.write(data.typecode.encode() + len(data).to_bytes(8, 'little'))
+                data.tofile(file)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+
+_oracles = {}
+
+
+def oracle(topology, landmarks=LANDMARKS, cache=True):
+    """Returns a distance oracle for the topology, dense for small caves and
+    landmark based for large ones. Loaded from the cache if it has been built
+    before, and kept in memory for the next request."""
+    key = topology.digest(), landmarks
+    if cache and key in _oracles:
+        return _oracles[key]
+
+    if topology.size <= DENSE_LIMIT:
+        arrays = load(topology, DenseOracle.KIND, DenseOracle.name) if cache else None
+        result = DenseOracle(topology, arrays[0] if arrays else None)
+    else:
+        name = "landmarks{0}".format(landmarks)
+        arrays = load(topology, LandmarkOracle.KIND, name) if cache else None
+        result = LandmarkOracle(topology, landmarks, arrays)
+
+    if cache:
+        if arrays is None:
+            save(topology, result)
+        _oracles[key] = result
+    return result
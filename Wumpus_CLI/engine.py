@@ -0,0 +1,364 @@
+import random
+from collections import namedtuple
+from objects import CSC, Event, is_fatal
+from board import BATS, PIT, WUMPUS, DANGERS
+from allocator import NoFreeSlot
+from topology import DODECAHEDRON
+
+ARROWS = 2
+
+Move = namedtuple('Move', 'room')
+Move.__doc__ = """Action. Player moves to the culvert with the given name."""
+
+Shoot = namedtuple('Shoot', 'path')
+Shoot.__doc__ = """Action. Player shoots an arrow along the given culvert names."""
+
+
+class Engine:
+    """Headless game engine. Runs the rules of a CSC instance one action at
+    a time, without asking for input or printing anything. Every step returns
+    the resulting events, the last one being WIN or LOSS when the game ends."""
+    def __init__(self, csc=None, arrows=ARROWS):
+        self.csc = csc if csc is not None else CSC()
+        self.rules = self.csc
+        self.restart(arrows)
+
+    def restart(self, arrows=ARROWS):
+        """Sets the counts and the outcome back to those of a game not yet played."""
+        self.arrows = arrows
+        self.moves = 0
+        self.shots = 0
+        self.over = False
+        self.won = False
+        self.cause = None
+
+    def step(self, action):
+        """Performs the given action (Move or Shoot), lets Wumpus take its turn
+        and returns the events that occurred. Actions after the game has ended
+        are ignored."""
+        if self.over:
+            return []
+
+        self.moves += 1
+        if isinstance(action, Shoot):
+            events = self.rules.shoot(action.path)
+            if events[-1].kind != Event.INVALID:
+                self.shots += 1
+                if events[-1].kind == Event.HIT:
+                    return self.end(events, True)
+                self.arrows -= 1
+        else:
+            events = self.rules.move_player(action.room)
+
+        if is_fatal(events):
+            return self.end(events, False)
+
+        events.extend(self.rules.move_wumpus())
+        if is_fatal(events):
+            return self.end(events, False)
+
+        if self.arrows <= 0:
+            events.append(Event(Event.NO_ARROWS, self.room))
+            return self.end(events, False)
+        return events
+
+    def end(self, events, won):
+        """The game has come to an end. Remembers what caused it and
+        appends the final event."""
+        self.over = True
+        self.won = won
+        self.cause = events[-1].kind
+        events.append(Event(Event.WIN if won else Event.LOSS, self.room))
+        return events
+
+    def play(self, policy, limit=1000):
+        """Plays a whole game by repeatedly asking the policy for an action.
+        The policy is called with the engine and returns a Move or Shoot.
+        Returns True if the game was won."""
+        while not self.over and self.moves < limit:
+            self.step(policy(self))
+        return self.won
+
+    @property
+    def room(self):
+        """Returns the name of the culvert the player is in."""
+        return self.csc.player_pos.name
+
+    @property
+    def exits(self):
+        """Returns the names of the culverts adjacent to the player."""
+        return [x.name for x in self.csc.player_pos.neighbors]
+
+    @property
+    def warnings(self):
+        """Returns the dangers the player can sense from adjacent culverts, as board flags."""
+        return self.csc.player_pos.warnings
+
+    def senses(self):
+        """Returns what the player can sense from adjacent culverts,
+        as booleans (Wumpus, bats, pit)."""
+        warnings = self.csc.player_pos.warnings
+        return bool(warnings & WUMPUS), bool(warnings & BATS), bool(warnings & PIT)
+
+
+class BoardEngine(Engine):
+    """Headless game engine over a bare board: the dangers of every culvert, one byte
+    each as in 'board.Board', and the culverts of the player and Wumpus. It plays by
+    the same rules as a CSC, without building its culverts, so that a batch of boards
+    from 'board.generate' can be played one after another by a single instance. All
+    randomness of the rules is drawn from the given generator."""
+    def __init__(self, difficulty=3, rng=random, topology=DODECAHEDRON, arrows=ARROWS):
+        self.csc = None
+        self.rules = self
+        self.difficulty = difficulty
+        self.rng = rng
+        self.start_arrows = arrows
+        self.neighbors = [topology.neighbors(index) for index in range(topology.size)]
+        self.names = [tuple(neighbor + 1 for neighbor in row) for row in self.neighbors]
+        self.hazards = bytearray(topology.size)
+        self.player = self.wumpus = None
+        self.restart(arrows)
+
+    def reset(self, hazards, player, wumpus=None):
+        """Starts a new game on the given dangers, with the player in the given culvert.
+        Wumpus is looked up in the dangers, unless its culvert is given."""
+        self.hazards[:] = hazards
+        self.player = player
+        if wumpus is None:
+            wumpus = next((index for index, hazard in enumerate(self.hazards) if hazard & WUMPUS), None)
+        self.wumpus = wumpus
+        self.restart(self.start_arrows)
+
+    def load(self, boards, item):
+        """Starts a new game on the board with the given number in a batch of boards."""
+        self.reset(boards.hazards[item].tobytes(), int(boards.player[item]), int(boards.wumpus[item]))
+
+    def drop(self):
+        """Returns a random culvert without dangers or Wumpus, where bats drop the player,
+        as CSC.place_entity. Raises NoFreeSlot if there is none."""
+        hazards, size = self.hazards, len(self.hazards)
+        for _ in range(4 * size):
+            index = self.rng.randrange(size)
+            if not hazards[index]:
+                return index
+        empty = [index for index, hazard in enumerate(hazards) if not hazard]
+        if not empty:
+            raise NoFreeSlot("No free culvert left.")
+        return self.rng.choice(empty)
+
+    def resolve(self):
+        """Checks what the player has met in their culvert, as CSC.resolve.
+        Returns the resulting events."""
+        player = self.player
+        hazard = self.hazards[player]
+        if hazard & WUMPUS:
+            if self.difficulty <= 3 and self.rng.randint(0, 100) < 35:
+                return [Event(Event.WUMPUS, player + 1), Event(Event.ESCAPED, player + 1)]
+            return [Event(Event.WUMPUS, player + 1), Event(Event.CAUGHT, player + 1)]
+        elif hazard & PIT:
+            return [Event(Event.PIT, player + 1)]
+        elif hazard & BATS:
+            self.player = self.drop()
+            return [Event(Event.BATS, self.player + 1)]
+        return []
+
+    def move_player(self, room):
+        """Moves the player to the culvert with the given name, if it is adjacent,
+        as CSC.move_player. Returns the resulting events."""
+        if room in self.names[self.player]:
+            self.player = room - 1
+            events = [Event(Event.MOVED, room)]
+        else:
+            events = [Event(Event.INVALID, room)]
+        events.extend(self.resolve())
+        return events
+
+    def move_wumpus(self):
+        """Lets Wumpus move to an adjacent culvert without bats or pit,
+        on the difficulties where it moves, as CSC.move_wumpus."""
+        origin = self.wumpus
+        if self.difficulty <= 3 or origin is None:
+            return []
+        hazards = self.hazards
+        safe = [neighbor for neighbor in self.neighbors[origin] if not hazards[neighbor] & DANGERS]
+        if not safe:
+            return []
+        destination = self.rng.choice(safe)
+        hazards[origin] &= ~WUMPUS
+        hazards[destination] |= WUMPUS
+        self.wumpus = destination
+        events = [Event(Event.WUMPUS_MOVED, destination + 1)]
+        events.extend(self.resolve())
+        return events
+
+    def shoot(self, path):
+        """Shoots an arrow along the given culvert names, as CSC.shoot.
+        Returns the resulting events."""
+        arrow = self.player
+        events = []
+        for room in path[:3]:
+            if room not in self.names[arrow]:
+                events.append(Event(Event.INVALID, room))
+                return events
+
+            arrow = room - 1
+            events.append(Event(Event.ARROW, room))
+            if arrow == self.player:
+                events.append(Event(Event.SELF_SHOT, room))
+                return events
+            elif self.hazards[arrow] & WUMPUS:
+                events.append(Event(Event.HIT, room))
+                return events
+
+        events.append(Event(Event.MISS, arrow + 1))
+        return events
+
+    @property
+    def room(self):
+        """Returns the name of the culvert the player is in."""
+        return self.player + 1
+
+    @property
+    def exits(self):
+        """Returns the names of the culverts adjacent to the player."""
+        return self.names[self.player]
+
+    @property
+    def warnings(self):
+        """Returns the dangers the player can sense from adjacent culverts, as board flags."""
+        hazards = self.hazards
+        mask = 0
+        for neighbor in self.neighbors[self.player]:
+            mask |= hazards[neighbor]
+        return mask
+
+    def senses(self):
+        """Returns what the player can sense from adjacent culverts,
+        as booleans (Wumpus, bats, pit)."""
+        warnings = self.warnings
+        return bool(warnings & WUMPUS), bool(warnings & BATS), bool(warnings & PIT)
+
+
+class BatchEngine:
+    """Headless game engine over a whole batch of boards from 'board.generate',
+    played at once with NumPy: every turn is taken in all the games still going
+    by a few array operations. It plays by the same rules as BoardEngine, but draws
+    its random choices for the whole batch at a time, so with the same seed it
+    plays other games than BoardEngine, only alike ones. The cave's culverts must
+    all have the same number of neighbors.
+
+    A policy is called with the engine and the numbers of the games still going,
+    and returns two arrays: for each of those games, whether to shoot, and the
+    index of the adjacent culvert to move or shoot into. An arrow is shot into one
+    culvert only, so it can never come back to the player."""
+    CAUSES = (None, Event.HIT, Event.CAUGHT, Event.PIT, Event.NO_ARROWS)
+
+    def __init__(self, boards, difficulty=3, seed=None, arrows=ARROWS):
+        import numpy as np
+        count = len(boards)
+        self.difficulty = difficulty
+        self.rng = np.random.default_rng(seed)
+        self.neighbors = boards.topology.as_numpy()
+        self.hazards = np.array(boards.hazards, dtype=np.uint8)
+        self.player = np.array(boards.player, dtype=np.intp)
+        self.wumpus = np.array(boards.wumpus, dtype=np.intp)
+        self.arrows = np.full(count, arrows, dtype=np.int32)
+        self.moves = np.zeros(count, dtype=np.int32)
+        self.shots = np.zeros(count, dtype=np.int32)
+        self.over = np.zeros(count, dtype=bool)
+        self.won = np.zeros(count, dtype=bool)
+        self.cause = np.zeros(count, dtype=np.int8)
+
+    def play(self, policy, limit=1000):
+        """Plays every game until it is over or has taken limit moves.
+        Returns for every game whether it was won."""
+        import numpy as np
+        while True:
+            games = np.flatnonzero(~self.over & (self.moves < limit))
+            if not len(games):
+                return self.won
+            shoot, target = policy(self, games)
+            self.step(games, shoot, target)
+
+    def step(self, games, shoot, target):
+        """Takes a turn in the given games, as Engine.step: the player shoots into
+        or moves to the target culverts, then Wumpus takes its turn."""
+        self.moves[games] += 1
+
+        shooting, aimed = games[shoot], target[shoot]
+        self.shots[shooting] += 1
+        hit = self.hazards[shooting, aimed] & WUMPUS != 0
+        self.end(shooting[hit], Event.HIT, True)
+        self.arrows[shooting[~hit]] -= 1
+
+        moving = games[~shoot]
+        self.player[moving] = target[~shoot]
+        self.resolve(moving)
+
+        going = games[~self.over[games]]
+        if self.difficulty > 3:
+            self.move_wumpus(going)
+            going = going[~self.over[going]]
+        self.end(going[self.arrows[going] <= 0], Event.NO_ARROWS)
+
+    def end(self, games, cause, won=False):
+        """The given games have come to an end, for the given cause."""
+        self.over[games] = True
+        self.won[games] = won
+        self.cause[games] = self.CAUSES.index(cause)
+
+    def resolve(self, games):
+        """Checks what the players of the given games have met in their culverts,
+        as BoardEngine.resolve."""
+        hazard = self.hazards[games, self.player[games]]
+        met = hazard & WUMPUS != 0
+        caught = met
+        if self.difficulty <= 3:
+            caught = met & (self.rng.integers(0, 101, len(games)) >= 35)
+        self.end(games[caught], Event.CAUGHT)
+        pit = ~met & (hazard & PIT != 0)
+        self.end(games[pit], Event.PIT)
+        self.drop(games[~met & ~pit & (hazard & BATS != 0)])
+
+    def drop(self, games):
+        """Bats drop the players of the given games in random culverts without
+        dangers or Wumpus, as BoardEngine.drop. Raises NoFreeSlot if there is none."""
+        import numpy as np
+        if not len(games):
+            return
+        free = self.hazards[games] == 0
+        if not free.any(axis=1).all():
+            raise NoFreeSlot("No free culvert left.")
+        self.player[games] = np.where(free, self.rng.random(free.shape), -1.0).argmax(axis=1)
+
+    def move_wumpus(self, games):
+        """Lets Wumpus move to an adjacent culvert without bats or pit in the given
+        games, as BoardEngine.move_wumpus. Only call it on difficulties where it moves."""
+        import numpy as np
+        around = self.neighbors[self.wumpus[games]]
+        safe = self.hazards[games[:, None], around] & DANGERS == 0
+        able = safe.any(axis=1)
+        games, around, safe = games[able], around[able], safe[able]
+        if not len(games):
+            return
+        destination = around[np.arange(len(games)), np.where(safe, self.rng.random(safe.shape), -1.0).argmax(axis=1)]
+        self.hazards[games, self.wumpus[games]] &= np.uint8(0xFF ^ WUMPUS)
+        self.hazards[games, destination] |= np.uint8(WUMPUS)
+        self.wumpus[games] = destination
+        self.resolve(games)
+
+    def exits(self, games):
+        """Returns the indices of the culverts adjacent to the players of the given
+        games, one row per game."""
+        return self.neighbors[self.player[games]]
+
+    def warnings(self, games):
+        """Returns the dangers the players of the given games can sense from
+        adjacent culverts, as board flags."""
+        import numpy as np
+        return np.bitwise_or.reduce(self.hazards[games[:, None], self.exits(games)], axis=1)
+
+    def causes(self):
+        """Returns what ended every game, 'WIN' for games won and
+        None for games not over."""
+        return ['WIN' if won else self.CAUSES[cause] for won, cause in zip(self.won.tolist(), self.cause.tolist())]
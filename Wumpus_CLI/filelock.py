@@ -0,0 +1,101 @@
+"""Advisory file locks and atomic file replacement. Lets several game processes
+share the same files: writers take turns through a lock file, and a file is
+only ever replaced as a whole, so readers and crashes never see half of it.
+
+Both games keep the same copy of this module, so that either folder runs on
+its own. The GUI's doctest checks that the copies do not drift apart."""
+
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """An exclusive lock held on a separate lock file, for use in a with statement.
+    Blocks until no other process holds it. The lock is released by the operating
+    system if the process dies, so a crash never leaves it taken."""
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        """Opens the lock file and waits for the lock."""
+        self.file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            # Retries for about ten seconds, then raises OSError.
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+
+    def release(self):
+        """Releases the lock and closes the lock file."""
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def sync_folder(folder):
+    """Flushes a folder entry to disk, so a rename in it survives a crash.
+    Not possible on every platform, which is not an error."""
+    try:
+        descriptor = os.open(folder or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def new_file_mode():
+    """Returns the permissions a new file gets from open, read and write
+    for everyone, less the process' umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def atomic_write(path, lines):
+    """Replaces the file with the given text lines. They are written to a temporary
+    file in the same folder, flushed to disk and renamed over the old file, so the
+    file always holds either the old or the new content."""
+    folder = os.path.dirname(path)
+    descriptor, temp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=folder or ".")
+    try:
+        with open(descriptor, 'w', encoding='utf-8') as file:
+            # The temporary file is only readable by its owner. It keeps the
+            # permissions of the file it replaces, or gets those of a new file.
+            if os.path.exists(path):
+                os.chmod(temp, os.stat(path).st_mode & 0o777)
+            else:
+                os.chmod(temp, new_file_mode())
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    sync_folder(folder)
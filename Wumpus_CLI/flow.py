@@ -0,0 +1,213 @@
+"""The menu and the games as a player goes through them, shared by the CLI and
+the game server. The flow only writes to a screen. Whenever it needs something
+from outside, the player's answer to a question or a call into the score store,
+it yields a request and is sent back the result. The CLI answers the requests
+from the terminal, the server from the connection, with the score store calls
+run on its worker thread."""
+
+import random
+from collections import namedtuple
+
+from objects import CSC, HighScore, describe
+from engine import Engine, Move, Shoot
+from board import SEED_BITS
+from modules import CATALOG, is_numerical, within_range
+from instrument import INSTRUMENTS
+
+BACK = "Tryck 'Enter' för att gå tillbaka till menyn."
+ARROW_STEPS = ("första", "andra", "tredje")
+
+Ask = namedtuple('Ask', 'query')
+Ask.__doc__ = """A question to the player, answered with the line they enter."""
+
+Call = namedtuple('Call', 'function args')
+Call.__doc__ = """A call that may block, answered with what the function returns."""
+
+
+def run(steps, screen):
+    """Drives a flow in the terminal. Questions are asked on the screen and calls
+    are made right away. An interrupted question is passed on to the flow.
+    Returns what the flow returns."""
+    try:
+        request = next(steps)
+        while True:
+            try:
+                if isinstance(request, Ask):
+                    answer = screen.input(request.query)
+                else:
+                    answer = request.function(*request.args)
+            except KeyboardInterrupt as interrupt:
+                request = steps.throw(interrupt)
+            else:
+                request = steps.send(answer)
+    except StopIteration as stop:
+        return stop.value
+
+
+def ask_number(screen, query, min_value, max_value):
+    """Asks until the answer is a number within the given range, and returns it."""
+    while True:
+        choice = yield Ask(query)
+        if is_numerical(choice):
+            if within_range(int(choice), min_value, max_value):
+                return int(choice)
+            screen.write("\nAnge en siffra mellan " + str(min_value) + " och " + str(max_value) + ".")
+        else:
+            screen.write("\nDu måste mata in en siffra.")
+
+
+def ask_choice(screen, query, char_1, char_2):
+    """Asks for input, converts to lower case and checks if it starts with
+    any of two given characters. Returns that character, or None."""
+    try:
+        string = yield Ask(query)
+    except KeyboardInterrupt:
+        return None
+    if string != "":
+        char = string[0].lower()
+        if char in (char_1, char_2):
+            return char
+        screen.write("Du förstår inte vad du menar med '" + string + "'.")
+    return None
+
+
+def wait(screen, msg):
+    """Waits for the player before proceeding."""
+    yield Ask("\n" + msg)
+    screen.clear()
+
+
+class Flow:
+    """One player's way through the menu and the games. Every game is played
+    in a new CSC, seeded from a generator that may be seeded to replay a session,
+    and scored in a new HighScore. If a recorder is given, every game is recorded."""
+    def __init__(self, screen, store=None, seed=None, difficulty=3, recorder=None):
+        self.screen = screen
+        self.store = store
+        self.seeds = random.Random(seed)
+        self.difficulty = difficulty
+        self.recorder = recorder
+
+        self.CSC = None
+        self.HighScore = None
+
+    def menu(self):
+        """Shows the menu and takes the player to the chosen screen,
+        until the player quits."""
+        self.screen.clear()
+        while True:
+            self.screen.write(CATALOG.get('Strings', 'Welcome'))
+            self.screen.write(CATALOG.get('Strings', 'Menu'))
+            option = yield from ask_number(self.screen, "Val: ", 1, 5)
+            self.screen.clear()
+            if option == 1:
+                self.screen.write(CATALOG.get('Strings', 'Instructions'))
+                yield from wait(self.screen, BACK)
+            elif option == 2:
+                yield from self.change_difficulty()
+                yield from wait(self.screen, BACK)
+            elif option == 3:
+                yield from self.new_game()
+            elif option == 4:
+                self.screen.write(CATALOG.get('Strings', 'TopScore'))
+                self.screen.write((yield Call(HighScore(self.store).table, ())))
+                yield from wait(self.screen, BACK)
+            elif option == 5:
+                self.screen.write(CATALOG.get('Strings', 'Leave'))
+                return
+
+    def change_difficulty(self):
+        """Player specifies wanted difficulty, used from the next game on."""
+        self.screen.write(CATALOG.get('Strings', 'Difficulty'))
+        self.screen.write("Aktuell svårighetsgrad: " + str(self.difficulty))
+        self.difficulty = yield from ask_number(self.screen, "Vilken svårighetsgrad vill du spela på? (1-5) ", 1, 5)
+        self.screen.write("\nSvårighetsgrad ändrad till: " + str(self.difficulty) + ".")
+
+    def new_game(self):
+        """Plays games until the player wants to return to the menu."""
+        while True:
+            self.CSC = CSC(self.difficulty, seed=self.seeds.getrandbits(SEED_BITS))
+            self.HighScore = HighScore(self.store)
+            yield from self.player_event()
+
+            option = None
+            while option is None:
+                option = yield from ask_choice(self.screen, "Vill du spela igen? (J/N) ", 'j', 'n')
+            if option == 'n':
+                return
+
+    def player_event(self):
+        """Asks whether the player wants to move/shoot and passes the action on
+        to the game engine. Writes out the consequences of the player's actions,
+        and when the game ends, whether it was won or lost. Waiting for the player,
+        the rules and the output are timed as phases."""
+        engine = Engine(self.CSC)
+        if self.recorder:
+            self.recorder.start(self.CSC)
+        INSTRUMENTS.count('games')
+        while not engine.over:
+            with INSTRUMENTS.phase('render'):
+                self.screen.write(self.CSC.player_pos)
+            with INSTRUMENTS.phase('prompt'):
+                option = yield from ask_choice(self.screen, "Vill du förflytta dig eller skjuta? (F/S) ", 'f', 's')
+                if option == 'f':
+                    action = Move((yield from self.ask_move()))
+                elif option == 's':
+                    action = Shoot((yield from self.ask_shot()))
+                else:
+                    continue
+
+            self.HighScore.player_score_incr()
+            if self.recorder:
+                self.recorder.action(action)
+            INSTRUMENTS.count('turns')
+            with INSTRUMENTS.phase('rules'):
+                events = engine.step(action)
+            with INSTRUMENTS.phase('render'):
+                for message in describe(events):
+                    self.screen.write(message)
+
+        if self.recorder:
+            self.recorder.finish(engine)
+
+        if engine.won:
+            self.screen.write("\nDu har vunnit!")
+            yield from self.check_highscore()
+        else:
+            self.screen.write("\nDu har förlorat.")
+
+    def ask_move(self):
+        """Player has requested to move. Asks for the culvert to move to."""
+        return (yield from ask_number(self.screen, "Till vilken kulvert? ", 1, len(self.CSC.culverts)))
+
+    def ask_shot(self):
+        """Player has requested to shoot. User may control the arrow's direction
+        for three moves. Stops asking if the arrow would hit something on the way.
+        Returns the path of the arrow."""
+        arrow_pos = self.CSC.player_pos
+        path = []
+        for culvert in ARROW_STEPS:
+            while True:
+                self.screen.write("\nPilen lämnar " + culvert + " kulverten. Välj nästa kulvert. "
+                                  "(" + ", ".join([str(x.name) for x in arrow_pos]) + ")")
+                choice = yield from ask_number(self.screen, "Val: ", 1, len(self.CSC.culverts))
+                destination = self.CSC[choice - 1]
+                if destination not in arrow_pos:
+                    self.screen.write("Pilar kan inte gå igenom väggar. Än.")
+                else:
+                    break
+
+            path.append(destination.name)
+            if self.CSC.arrow_stops(destination):
+                break
+            arrow_pos = destination
+        return path
+
+    def check_highscore(self):
+        """Player has won. Asks for a name if the score makes the top list."""
+        moves = self.HighScore.player_score
+        store = self.HighScore.store
+        if moves != 0 and (yield Call(store.qualifies, (moves, HighScore.TOP))):
+            self.screen.write("NYTT REKORD!")
+            name = yield Ask("Ange ditt namn: ")
+            yield Call(store.add, (name, moves))
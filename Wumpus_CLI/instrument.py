@@ -0,0 +1,148 @@
+"""Instrumentation. Records how long each phase of the game takes, every time
+it runs, and counts events, so that the distribution of e.g. a turn or a frame
+can be seen, not only its total as with a profiler. It is off unless the
+WUMPUS_INSTRUMENT environment variable, or the --instrument option of the
+game, names a file to export to when the game exits. A name ending in .csv
+gets a table of the phases and counters, any other name gets JSON, which
+also holds every sample.
+
+While off, a phase costs one call returning a shared object that does nothing.
+The game can also be run under cProfile, writing a pstats file.
+
+Both games keep the same copy of this module, so that either folder runs on
+its own. The GUI's doctest checks that the copies do not drift apart."""
+
+import atexit
+import os
+import time
+from collections import Counter, defaultdict
+
+ENVIRONMENT = "WUMPUS_INSTRUMENT"
+
+
+class Phase:
+    """Context manager timing one run of a phase."""
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class NoPhase:
+    """Context manager that does nothing, used while instrumentation is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NO_PHASE = NoPhase()
+
+
+def percentile(values, fraction):
+    """Returns the value below which the given fraction of the sorted values lies."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Instruments:
+    """Phase timings, in seconds, and counters of a session."""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.samples = defaultdict(list)
+        self.counters = Counter()
+        self.path = None
+
+    def phase(self, name):
+        """Returns a context manager that times the named phase."""
+        if not self.enabled:
+            return NO_PHASE
+        return Phase(self.samples[name])
+
+    def count(self, name, amount=1):
+        """Adds to the named counter."""
+        if self.enabled:
+            self.counters[name] += amount
+
+    def enable(self, path=None):
+        """Starts recording. If a path is given, the results are
+        exported to it when the program exits."""
+        self.enabled = True
+        if path and self.path is None:
+            atexit.register(self.save)
+        self.path = path or self.path
+
+    def summary(self):
+        """Returns the count, total, mean, p50, p99 and maximum in ms of every phase."""
+        phases = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            phases[name] = {
+                'count': len(ordered),
+                'total_ms': round(sum(ordered) * 1000, 3),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+                'p50_ms': round(percentile(ordered, 0.5) * 1000, 3),
+                'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+            }
+        return phases
+
+    def export(self, path):
+        """Writes the results to a CSV file, if the name ends in .csv, or else to a JSON file."""
+        phases = self.summary()
+        if path.lower().endswith(".csv"):
+            import csv
+            fields = ['count', 'total_ms', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms']
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['name', 'kind'] + fields)
+                for name in sorted(phases):
+                    writer.writerow([name, 'phase'] + [phases[name][field] for field in fields])
+                for name in sorted(self.counters):
+                    writer.writerow([name, 'counter', self.counters[name]] + [''] * (len(fields) - 1))
+        else:
+            import json
+            with open(path, 'w') as file:
+                json.dump({
+                    'phases': phases,
+                    'counters': dict(self.counters),
+                    'samples_ms': {name: [round(value * 1000, 4) for value in samples]
+                                   for name, samples in self.samples.items()},
+                }, file, indent=2, sort_keys=True)
+
+    def save(self):
+        """Exports the results to the path given when enabled."""
+        if self.path:
+            self.export(self.path)
+
+    def reset(self):
+        """Forgets all samples and counters."""
+        self.samples.clear()
+        self.counters.clear()
+
+
+INSTRUMENTS = Instruments()
+if os.environ.get(ENVIRONMENT):
+    INSTRUMENTS.enable(os.environ[ENVIRONMENT])
+
+
+def profile(function, path):
+    """Runs function under cProfile and returns what it returns. The statistics
+    are written to a pstats file, also if the function exits the program."""
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function)
+    finally:
+        profiler.dump_stats(path)
@@ -0,0 +1,154 @@
+"""Load generator for the game server. Opens a number of idle connections that
+only sit at the menu, and a number of players that play whole games by picking
+random exits, then reports turns per second and the latency of each turn,
+measured from sending an answer until the next question arrives."""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+
+from server import HOST, PORT, ENCODING
+
+PROMPTS = ("? ", ": ", ") ")
+ESCAPES = re.compile(r"\x1b\[[\d;]*[A-Za-z]")
+EXITS = re.compile(r"Gångarna leder till rum ([\d, ]+)")
+ARROW = re.compile(r"Välj nästa kulvert\. \(([\d, ]+)\)")
+
+
+def percentile(values, fraction):
+    """Returns the value below which the given fraction of the sorted values lies."""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Player:
+    """A scripted player. Answers every question the server asks,
+    moving to random exits and now and then shooting into one."""
+    def __init__(self, number, games, rng, shoot=0.2):
+        self.number = number
+        self.games = games
+        self.rng = rng
+        self.shoot = shoot
+        self.exits = []
+        self.played = 0
+        self.turns = 0
+        self.latencies = []
+
+    def answer(self, text):
+        """Returns the answer to the last question in the given server output.
+        Remembers the exits of the player's culvert, as they are shown before
+        the player is asked where to go."""
+        exits = EXITS.findall(text)
+        if exits:
+            self.exits = exits[-1].split(", ")
+        if text.endswith("(F/S) "):
+            return 's' if self.rng.random() < self.shoot else 'f'
+        if text.endswith("Till vilken kulvert? "):
+            return self.rng.choice(self.exits)
+        if text.endswith("(J/N) "):
+            self.played += 1
+            return 'j' if self.played < self.games else 'n'
+        if text.endswith("Ange ditt namn: "):
+            return "bot" + str(self.number)
+        if text.endswith("Val: "):
+            paths = ARROW.findall(text)
+            if paths:
+                return self.rng.choice(paths[-1].split(", "))
+            return '3' if self.played < self.games else '5'
+        return ""
+
+    async def read(self, reader):
+        """Reads server output until it asks a question. Returns None at the end.
+        Escape sequences that place the cursor are left out."""
+        received = text = ""
+        while not text.endswith(PROMPTS):
+            data = await reader.read(4096)
+            if not data:
+                return None
+            received += data.decode(ENCODING, 'ignore')
+            text = ESCAPES.sub("", received.replace("\r\n", "\n"))
+        return text
+
+    async def play(self, host, port):
+        """Connects and answers the server until it closes the connection."""
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            text = await self.read(reader)
+            while text is not None:
+                writer.write((self.answer(text) + "\r\n").encode(ENCODING))
+                start = time.perf_counter()
+                text = await self.read(reader)
+                self.latencies.append(time.perf_counter() - start)
+                self.turns += 1
+        finally:
+            writer.close()
+
+
+async def idle(host, port, connections, ready, done):
+    """Opens connections that stay at the menu until done is set."""
+    writers = []
+    for _ in range(connections):
+        reader, writer = await asyncio.open_connection(host, port)
+        writers.append(writer)
+    ready.set()
+    await done.wait()
+    for writer in writers:
+        writer.close()
+
+
+async def run(host=HOST, port=PORT, players=50, games=5, connections=0, seed=None):
+    """Runs the load and returns a summary of it."""
+    rng = random.Random(seed)
+    ready, done = asyncio.Event(), asyncio.Event()
+    idler = asyncio.ensure_future(idle(host, port, connections, ready, done))
+    await ready.wait()
+
+    bots = [Player(number, games, random.Random(rng.random())) for number in range(players)]
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*[bot.play(host, port) for bot in bots])
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        await idler
+
+    latencies = sorted(latency for bot in bots for latency in bot.latencies)
+    turns = sum(bot.turns for bot in bots)
+    return {
+        'idle': connections,
+        'players': players,
+        'games': sum(bot.played for bot in bots),
+        'turns': turns,
+        'seconds': round(elapsed, 3),
+        'turns_per_second': round(turns / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.5) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0,
+        },
+    }
+
+
+def main():
+    """Reads the arguments, runs the load and prints the summary."""
+    parser = argparse.ArgumentParser(description="Generates load for the game server.")
+    parser.add_argument('--host', default=HOST, help="server address")
+    parser.add_argument('-p', '--port', type=int, default=PORT, help="server port")
+    parser.add_argument('-n', '--players', type=int, default=50, help="players playing at once")
+    parser.add_argument('-g', '--games', type=int, default=5, help="games per player")
+    parser.add_argument('-i', '--idle', type=int, default=0, help="idle connections held open")
+    parser.add_argument('-s', '--seed', type=int, help="seed for the players' choices")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args.host, args.port, args.players, args.games, args.idle, args.seed))
+
+    print("{idle} idle connections, {players} players, {games} games, {turns} turns".format(**summary))
+    print("{0} turns per second in {1} s".format(summary['turns_per_second'], summary['seconds']))
+    print("Latency p50 {p50} ms, p99 {p99} ms, max {max} ms".format(**summary['latency_ms']))
+
+
+if __name__ == "__main__":
+    main()
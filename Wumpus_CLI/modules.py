@@ -1,14 +1,22 @@
 import os
-import json
+import time
+import marshal
+import atexit
+
+from render import Screen
 
 ASSET_FOLDER = os.path.join(os.path.dirname(os.path.relpath(__file__)), "assets/")
 DATA = "data.json"
+DATA_COMPILED = "data.cache"
 HIGHSCORE = "highscore.txt"
 
 
 def load_json(asset):
     """Loads a JSON file from the asset folder.
-    In case it does not exist an error is printed, and game exits."""
+    In case it does not exist an error is printed, and game exits.
+    The json module is only imported here, as a precompiled catalog makes
+    parsing unnecessary on most starts."""
+    import json
     try:
         with open(os.path.join(ASSET_FOLDER, asset), 'r') as file:
             data = json.load(file)
@@ -18,44 +26,128 @@ def load_json(asset):
         raise SystemExit(message)
 
 
-def load_data(asset):
-    """Loads a data file from the asset folder.
-    In case the file does not exist, it is created."""
-    try:
-        with open(os.path.join(ASSET_FOLDER, asset), 'r') as file:
-            data = file.read().splitlines()
-            return data
-    except IOError:
-        with open(os.path.join(ASSET_FOLDER, asset), 'w+') as file:
-            data = file.read().splitlines()
-            return data
+class Catalog:
+    """String catalog. Holds the contents of the JSON data file in memory so that
+    it is only parsed once. The file is reloaded if it has been modified on disk,
+    and a precompiled copy is kept next to it so that a cold start skips parsing."""
+    VERSION = 1
+
+    def __init__(self, asset=DATA, compiled=DATA_COMPILED, interval=1.0):
+        self.asset = asset
+        self.path = os.path.join(ASSET_FOLDER, asset)
+        self.compiled = os.path.join(ASSET_FOLDER, compiled)
+        self.interval = interval
+
+        self._data = None
+        self._index = None
+        self._stamp = None
+        self._checked = 0.0
+
+    def _source_stamp(self):
+        """Returns modification time and size of the JSON file,
+        or None if it can not be found."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_compiled(self, stamp):
+        """Loads the precompiled catalog. Returns None if it is missing,
+        unreadable or out of date with the JSON file."""
+        try:
+            with open(self.compiled, 'rb') as file:
+                version, compiled_stamp, data = marshal.load(file)
+        except (IOError, EOFError, ValueError, TypeError):
+            return None
+        if version != self.VERSION:
+            return None
+        if stamp is not None and tuple(compiled_stamp) != stamp:
+            return None
+        return data
+
+    def compile(self, data=None, stamp=None):
+        """Writes the precompiled catalog artifact. The JSON file is parsed
+        unless data is given. Returns True if the artifact could be written."""
+        if data is None:
+            stamp = self._source_stamp()
+            data = load_json(self.asset)
+        temp = self.compiled + ".tmp"
+        try:
+            with open(temp, 'wb') as file:
+                marshal.dump((self.VERSION, stamp, data), file)
+            os.replace(temp, self.compiled)
+        except IOError:
+            return False
+        return True
+
+    def load(self):
+        """Loads the catalog, preferably from the precompiled artifact.
+        Calls for the artifact to be rebuilt if it is out of date."""
+        stamp = self._source_stamp()
+        data = self._load_compiled(stamp)
+        if data is None:
+            data = load_json(self.asset)
+            self.compile(data, stamp)
+
+        self._data = data
+        self._index = None
+        self._stamp = stamp
+        self._checked = time.monotonic()
+
+    def refresh(self):
+        """Reloads the catalog if the JSON file has changed since it was loaded.
+        The file is checked at most once per interval."""
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return
+        self._checked = now
+        if self._source_stamp() != self._stamp:
+            self.load()
+
+    @property
+    def data(self):
+        """Returns the catalog contents, loading them on first use."""
+        if self._data is None:
+            self.load()
+        else:
+            self.refresh()
+        return self._data
+
+    @property
+    def index(self):
+        """Returns a flat (category, title) index of all strings.
+        Built the first time it is requested after a load."""
+        data = self.data
+        if self._index is None:
+            self._index = {(category, title): string
+                           for category, titles in data.items()
+                           for title, string in titles.items()}
+        return self._index
+
+    def get(self, category, title):
+        """Returns the string with the given title in the given category.
+        Raises KeyError if there is no such string."""
+        try:
+            return self.index[category, title]
+        except KeyError:
+            return self.data[category][title]
+
+
+CATALOG = Catalog()
+SCREEN = Screen()
+atexit.register(SCREEN.flush)
 
 
 def output(category, title, player_pos=""):
     """A request for a specific string has been received.
-    Calls for load of JSON file and prints out the corresponding string
-    in the correct category."""
-    data = load_json(DATA)
+    Looks up the string in the string catalog and prints it out."""
+    string = CATALOG.get(category, title)
 
     if player_pos == "":
-        print(str(data[category][title]))
+        SCREEN.write(string)
     else:
-        print(str(data[category][title] + str(player_pos) + "."))
-
-
-def check_input(query, min_value, max_value):
-    """Calls for check that input is numerical and
-    calls for a check that it is within the given range that the callee function has specified"""
-    while True:
-        choice = input(query)
-        if is_numerical(choice):
-            if within_range(is_numerical(choice)[1], min_value, max_value):
-                break
-            else:
-                print("\nAnge en siffra mellan " + str(min_value) + " och " + str(max_value) + ".")
-        else:
-            print("\nDu måste mata in en siffra.")
-    return int(choice)
+        SCREEN.write(string + str(player_pos) + ".")
 
 
 def is_numerical(query):
@@ -75,29 +167,13 @@ def within_range(value, min_value, max_value):
         return False
 
 
-def string_check(query, char_1, char_2):
-    """Asks for input, converts to lower case and checks
-     if it matches any of two given characters."""
-    try:
-        string = input(query)
-        if string != "":
-            char = string[0].lower()
-            if char == char_1:
-                return char
-            elif char == char_2:
-                return char
-            else:
-                print("Du förstår inte vad du menar med '" + string + "'.")
-    except KeyboardInterrupt:
-        pass
-
-
 def clear():
-    """Clears screen independent of platform."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    """Clears the screen. The next screen is sent once the player is asked
+    for input, and only with the lines that differ from this one."""
+    SCREEN.clear()
 
 
-def wait(msg):
-    """Waits for input before proceeding."""
-    input("\n" + msg)
-    clear()
+if __name__ == "__main__":
+    """Builds the precompiled string catalog."""
+    if CATALOG.compile():
+        print("Catalog compiled to " + CATALOG.compiled)
@@ -1,7 +1,11 @@
 import random
+from collections import namedtuple
+from collections.abc import Sequence
 from modules import *
-from prettytable import PrettyTable
-from operator import attrgetter
+from board import Board, CHANCE, BATS_RANGE, PIT_RANGE, new_seed
+from allocator import NoFreeSlot
+from topology import DODECAHEDRON
+import board
 
 
 class PlayerDead(Exception):
@@ -11,22 +15,82 @@ class PlayerDead(Exception):
         return self + other
 
 
-class WumpusDead(Exception):
-    """Player Wins"""
+class Event(namedtuple('Event', 'kind room')):
+    """A consequence of a player action, e.g. meeting bats or killing Wumpus.
+    Holds the kind of event and the name of the culvert it happened in."""
+    __slots__ = ()
 
-    def __add__(self, other):
-        return self + other
+    MOVED = 'MOVED'
+    INVALID = 'INVALID'
+    BATS = 'BATS'
+    PIT = 'PIT'
+    WUMPUS = 'WUMPUS'
+    ESCAPED = 'ESCAPED'
+    CAUGHT = 'CAUGHT'
+    WUMPUS_MOVED = 'WUMPUS_MOVED'
+    ARROW = 'ARROW'
+    MISS = 'MISS'
+    SELF_SHOT = 'SELF_SHOT'
+    HIT = 'HIT'
+    NO_ARROWS = 'NO_ARROWS'
+    WIN = 'WIN'
+    LOSS = 'LOSS'
+
+    FATAL = (PIT, CAUGHT, SELF_SHOT)
+
+
+def is_fatal(events):
+    """Checks if any of the events killed the player."""
+    return any(event.kind in Event.FATAL for event in events)
+
+
+def describe(events):
+    """Returns the corresponding message for each event,
+    so that the user may follow what happened."""
+    messages = []
+    for event in events:
+        kind = event.kind
+        if kind == Event.WUMPUS:
+            messages.append(CATALOG.get('Strings', 'WumpusFound'))
+        elif kind == Event.ESCAPED:
+            messages.append(CATALOG.get('Strings', 'Escape'))
+        elif kind == Event.CAUGHT:
+            messages.append(CATALOG.get('Strings', 'Caught'))
+        elif kind == Event.PIT:
+            messages.append(CATALOG.get('Strings', 'Pit'))
+        elif kind == Event.BATS:
+            messages.append(CATALOG.get('Strings', 'Bats') + str(event.room) + ".")
+        elif kind == Event.INVALID:
+            messages.append("\nDu kan inte gå till rum " + str(event.room) + ".")
+        elif kind == Event.MISS:
+            messages.append("Miss!")
+        elif kind == Event.SELF_SHOT:
+            messages.append("\nKlantigt! Du sköt dig själv med pilen!")
+        elif kind == Event.HIT:
+            messages.append("\nTräff! Du har dödat Wumpus.")
+        elif kind == Event.NO_ARROWS:
+            messages.append(CATALOG.get('Strings', 'NoArrows'))
+    return messages
+
+
+def report(events):
+    """Prints out the corresponding message for each event
+    so that the user may follow what happened."""
+    for message in describe(events):
+        SCREEN.write(message)
 
 
 class Culvert:
-    """Culvert class. Corresponds to an individual culvert.
-    It is given a name, and three neighbors."""
-    def __init__(self, name):
-        self.name = name
-        self.neighbors = (self, self, self)
-        self.danger = self.NONE
+    """Culvert class. Corresponds to an individual culvert, a view of one
+    entry in the board arrays. It is given a name, and its neighbors."""
+    __slots__ = ('_culverts', '_board', '_neighbors', 'index', 'name')
 
-        self._wumpus = False
+    def __init__(self, culverts, index):
+        self._culverts = culverts
+        self._board = culverts.board
+        self._neighbors = None
+        self.index = index
+        self.name = index + 1
 
     NONE = 'EMPTY'
     BATS = 'BATS'
@@ -35,15 +99,6 @@ class Culvert:
     ALERTS = {NONE: '', BATS: 'Jag hör fladdermöss!', PIT: 'Jag känner vinddrag!',
               WUMPUS: 'Jag känner lukten av Wumpus!'}
 
-    @staticmethod
-    def sorter(data):
-        """Checks if the input data has more than one entry of same type.
-        Removes any duplicates and returns a data set containing unique elements."""
-        string_set = set()
-        string_add = string_set.add
-
-        return [x for x in data if not (x in string_set or string_add(x))]
-
     def __len__(self):
         """Allows for iterating through
         the neighbors."""
@@ -56,242 +111,282 @@ class Culvert:
 
     def __str__(self):
         """Prints out information about the culvert and it's neighbors
-        so that the user may be aware of where they are, and what dangers are near."""
-        ret = [self.ALERTS[x.danger] for x in self.neighbors]
-        if [x for x in self.neighbors if x.wumpus]:
-            ret.insert(0, self.ALERTS[self.WUMPUS])
-        ret = ['    ' + x for x in ret if x]
-        ret.insert(0, "Du är i rum {0}.".format(self.name))
-        ret.append("\nGångarna leder till rum {0}, {1}, {2}".format(*[x.name for x in self.neighbors]))
+        so that the user may be aware of where they are, and what dangers are near.
+        The dangers near are looked up from the culvert's warnings."""
+        return "Du är i rum {0}.{1}\n\nGångarna leder till rum {2}".format(
+            self.name, WARNINGS[self._board.warnings[self.index]],
+            ", ".join([str(x.name) for x in self.neighbors]))
 
-        ret = self.sorter(ret)
-        return '\n'.join(ret)
+    @property
+    def warnings(self):
+        """Returns the combined dangers of the neighbors, as board flags."""
+        return self._board.warnings[self.index]
 
     def __repr__(self):
         """For debugging the program. Returns culvert name, neighbors and
          if wumpus, a bat or a pit is in it."""
-        return "[Culvert {0} - Neighbors:[{1}, {2}, {3}] Wumpus:{4} Danger:{5}]".format(
-            self.name,
-            self.neighbors[0].name, self.neighbors[1].name, self.neighbors[2].name,
+        return "[Culvert {0} - Neighbors:[{1}] Wumpus:{2} Danger:{3}]".format(
+            self.name, ", ".join([str(x.name) for x in self.neighbors]),
             self.wumpus, self.danger)
 
+    @property
+    def neighbors(self):
+        """Returns the adjacent culverts. Looked up the first time they are requested."""
+        if self._neighbors is None:
+            self._neighbors = tuple([self._culverts[i] for i in self._board.neighbors(self.index)])
+        return self._neighbors
+
+    @property
+    def danger(self):
+        """Returns the danger in the culvert: 'EMPTY', 'BATS' or 'PIT'."""
+        hazard = self._board.hazards[self.index]
+        if hazard & board.BATS:
+            return self.BATS
+        elif hazard & board.PIT:
+            return self.PIT
+        return self.NONE
+
     @property
     def wumpus(self):
         """Returns boolean value. True/False depending on
         if Wumpus is in the specified culvert."""
-        return self._wumpus
+        return bool(self._board.hazards[self.index] & board.WUMPUS)
 
     @wumpus.setter
     def wumpus(self, value):
         """Sets boolean value. True/False to the
         specified culvert."""
-        self._wumpus = value
+        if value:
+            self._board.set(self.index, board.WUMPUS)
+        else:
+            self._board.unset(self.index, board.WUMPUS)
 
     @property
     def bats(self):
         """Returns boolean value. True/False depending
         on if there are bats in the specified culvert."""
-        return self.danger == self.BATS
+        return bool(self._board.hazards[self.index] & board.BATS)
 
     @bats.setter
     def bats(self, value):
         """Sets boolean value. True/False to the
         specified culvert. Only if it is empty."""
         if value:
-            if self.danger == self.NONE:
-                self.danger = self.BATS
+            if not self._board.hazards[self.index] & board.DANGERS:
+                self._board.set(self.index, board.BATS)
 
     @property
     def pit(self):
-        """Sets boolean value. True/False to the
-        specified culvert. Only if it is empty."""
-        return self.danger == self.PIT
+        """Returns boolean value. True/False depending
+        on if there is a pit in the specified culvert."""
+        return bool(self._board.hazards[self.index] & board.PIT)
 
     @pit.setter
     def pit(self, value):
         """Sets boolean value. True/False to the
         specified culvert. Only if it is empty."""
         if value:
-            if self.danger == self.NONE:
-                self.danger = self.PIT
+            if not self._board.hazards[self.index] & board.DANGERS:
+                self._board.set(self.index, board.PIT)
 
 
-class CSC:
-    def __init__(self):
-        """Initializes the CSC Class."""
-        self._culverts = []
-        self._difficulty = 3
+class Culverts(Sequence):
+    """All the culverts of a board. The Culvert views are created when first
+    requested, so that large caves do not need an object for every culvert."""
+    def __init__(self, board):
+        self.board = board
+        self._views = [None] * board.size
 
-        self.combine_culverts()
-        random.choice(self._culverts).wumpus = True
-        self.initialize_dangers("bats")
-        self.initialize_dangers("pit")
-        self._player_pos = self.place_entity("PLAYER")
+    def __len__(self):
+        """Returns the number of culverts."""
+        return self.board.size
 
-    def combine_culverts(self):
-        """Creates the CSC complex by combining all the Culvert objects.
-        Randomly places Wumpus and calls for placement of pits and bats."""
+    def __getitem__(self, item):
+        """Returns the culvert with the given index, or a list of culverts for a slice."""
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(self.board.size))]
+        view = self._views[item]
+        if view is None:
+            index = item % self.board.size
+            view = self._views[index] = Culvert(self, index)
+        return view
 
-        for i in range(0, 20):
-            self._culverts.append(Culvert(i + 1))
-        scheme = ((1, 5, 4), (0, 7, 2), (1, 9, 3), (2, 11, 4),
-                  (3, 13, 0), (0, 14, 6), (5, 16, 7), (1, 6, 8),
-                  (7, 9, 17), (2, 8, 10), (9, 11, 18), (10, 3, 12),
-                  (19, 11, 13), (14, 12, 4), (13, 5, 15), (14, 19, 16),
-                  (6, 15, 17), (16, 8, 18), (10, 17, 19), (12, 15, 18))
 
-        for i, culvert in enumerate(scheme):
-            self._culverts[i].neighbors = tuple([self._culverts[i] for i in culvert])
+def warning_lines(mask):
+    """Returns the alert lines for a warnings mask, Wumpus first."""
+    ret = []
+    if mask & board.WUMPUS:
+        ret.append(Culvert.ALERTS[Culvert.WUMPUS])
+    if mask & board.BATS:
+        ret.append(Culvert.ALERTS[Culvert.BATS])
+    if mask & board.PIT:
+        ret.append(Culvert.ALERTS[Culvert.PIT])
+    return ''.join(['\n    ' + x for x in ret])
+
+
+WARNINGS = tuple(warning_lines(mask) for mask in range(8))
+
+
+class CSC:
+    def __init__(self, difficulty=3, board=None, player=None, topology=DODECAHEDRON, seed=None):
+        """Initializes the CSC Class. The cave may be given as a topology, by default
+        the 20 culvert scheme. A board with dangers already placed, e.g. one generated
+        by 'board.generate', may be given together with the player's position.
+        All randomness of the game is drawn from its own generator, seeded with
+        the given seed or a new one, so a game with the same seed plays the same."""
+        self._difficulty = difficulty
+        self.seed = seed if seed is not None else new_seed()
+        self.rng = random.Random(self.seed)
+
+        if board is None:
+            self.board = Board(topology, rng=self.rng)
+            self.combine_culverts()
+            self.rng.choice(self._culverts).wumpus = True
+            self.initialize_dangers("bats")
+            self.initialize_dangers("pit")
+            self.player_pos = self.place_entity("PLAYER")
+        else:
+            self.board = board
+            self.board.use(self.rng)
+            self.combine_culverts()
+            if player is None:
+                self.player_pos = self.place_entity("PLAYER")
+            else:
+                self.player_pos = self._culverts[player]
+
+    def combine_culverts(self):
+        """Creates the CSC complex of Culvert objects, each one combined with
+        its neighbors according to the board's topology."""
+        self._culverts = Culverts(self.board)
 
     def initialize_dangers(self, danger):
-        """Places the requested danger, bat or pit, in a random culvert.
+        """Places the requested danger, bat or pit, in random culverts.
         Two dangers may not be in the same place. Depending on the difficulty
-        there are different percentages of a danger being placed."""
+        there are different percentages of a danger being placed.
+        In a small cave, no more are placed once every culvert has a danger."""
         if danger == "pit":
-            occurrence = random.randrange(3, 7)
+            occurrence, flag = self.rng.randrange(*PIT_RANGE), board.PIT
         elif danger == "bats":
-            occurrence = random.randrange(3, 6)
+            occurrence, flag = self.rng.randrange(*BATS_RANGE), board.BATS
 
         for i in range(occurrence):
-            culvert = random.choice(self.culverts)
-            while culvert.bats or culvert.pit:
-                culvert = random.choice(self.culverts)
-
-            chance = random.randint(0, 100)
-            if self._difficulty == 5 and chance < 100:
-                setattr(culvert, danger, True)
-            elif self._difficulty == 4 and chance < 85:
-                setattr(culvert, danger, True)
-            elif self._difficulty == 3 and chance < 75:
-                setattr(culvert, danger, True)
-            elif (self._difficulty == 1 or self._difficulty == 2) and chance < 40:
-                setattr(culvert, danger, True)
-
-    def modify_dangers(self):
-        """User has requested difficulty to change.
-        Calls for all dangers to be removed, and calls for new to be placed."""
-        self.remove_dangers()
-
-        self.initialize_dangers("bats")
-        self.initialize_dangers("pit")
+            if self.rng.randint(0, 100) < CHANCE[self._difficulty]:
+                try:
+                    self.board.set(self.board.free.take(), flag)
+                except NoFreeSlot:
+                    break
 
     def remove_dangers(self):
         """Removes all dangers in all culverts. Except Wumpus."""
-        for culvert in self.culverts:
-            setattr(culvert, "pit", False)
-            setattr(culvert, "bats", False)
-
-    def change_difficulty(self):
-        """User specifies wanted difficulty. Calls for dangers to be modified."""
-        output('Strings', 'Difficulty')
-        print("Aktuell svårighetsgrad: " + str(self._difficulty))
-        self._difficulty = check_input("Vilken svårighetsgrad vill du spela på? (1-5) ", 1, 5)
-        self.modify_dangers()
-
-        print("\nSvårighetsgrad ändrad till: " + str(self._difficulty) + ".")
+        self.board.clear()
 
     def place_entity(self, entity):
-        """Randomly places requested entity in an empty culvert."""
-        destination = random.choice(self._culverts)
+        """Randomly places requested entity in an empty culvert. The player
+        is never placed together with Wumpus, bats or a pit.
+        Raises NoFreeSlot if there are no such culverts left."""
         if entity == "PLAYER":
-            while destination.wumpus or destination.bats or destination.pit:
-                destination = random.choice(self._culverts)
-
-        return destination
-
-    def player_move(self):
-        """Player has requested to move. Checks if the users movement is valid."""
-        destination = self[check_input("Till vilken kulvert? ", 0, 21) - 1]
-
-        if destination == self._player_pos:
-            print("\nDu kan inte gå till " + str(destination) + " du är redan där.")
-        elif destination not in self._player_pos:
-            print("\nDu kan inte gå till " + str(destination) + ", kulverten finns inte.")
+            return self._culverts[self.board.free.choose((self.board.positions.wumpus,))]
+        return self.rng.choice(self._culverts)
+
+    def move_player(self, room):
+        """Player has requested to move to the culvert with the given name.
+        Checks if the movement is valid and what the new position leads to.
+        Returns the resulting events."""
+        if 1 <= room <= len(self._culverts) and self._culverts[room - 1] in self.player_pos:
+            self.player_pos = self._culverts[room - 1]
+            events = [Event(Event.MOVED, room)]
         else:
-            self._player_pos = destination
+            events = [Event(Event.INVALID, room)]
+
+        events.extend(self.resolve())
+        return events
 
     def escape(self):
         """User has met Wumpus. Depending on difficulty, they might be allowed
         to escape Wumpus."""
         if self._difficulty <= 3:
-            if random.randint(0, 100) < 35:
+            if self.rng.randint(0, 100) < 35:
                 return True
             else:
                 return False
 
-    def check_move(self):
-        """Checks if user's movement caused any collision with another entity,
-        such as Wumpus, bats or a pit. If player met Wumpus or fell down in a pit
-        'PlayerDead' exception is raised. If a player met a bat, calls for
-        random placement of user."""
-        if self.player_pos.wumpus:
-            output('Strings', 'WumpusFound')
+    def resolve(self):
+        """Checks if the player's position caused any collision with another entity,
+        such as Wumpus, bats or a pit. If a player met a bat, calls for random
+        placement of user. Returns the resulting events, bats naming the culvert
+        the player was carried to."""
+        player = self.board.positions.player
+        hazard = self.board.hazards[player]
+        if hazard & board.WUMPUS:
             if self.escape():
-                output('Strings', 'Escape')
-            else:
-                output('Strings', 'Caught')
-                raise PlayerDead
-        elif self.player_pos.pit:
-            output('Strings', 'Pit')
+                return [Event(Event.WUMPUS, player + 1), Event(Event.ESCAPED, player + 1)]
+            return [Event(Event.WUMPUS, player + 1), Event(Event.CAUGHT, player + 1)]
+        elif hazard & board.PIT:
+            return [Event(Event.PIT, player + 1)]
+        elif hazard & board.BATS:
+            self.player_pos = self.place_entity("PLAYER")
+            return [Event(Event.BATS, self.board.positions.player + 1)]
+        return []
+
+    def check_move(self):
+        """Checks if user's movement caused any collision with another entity
+        and prints out what happened. If player met Wumpus or fell down in a pit
+        'PlayerDead' exception is raised."""
+        events = self.resolve()
+        report(events)
+        if is_fatal(events):
             raise PlayerDead
-        elif self.player_pos.bats:
-            self.place_entity("PLAYER")
-            output('Strings', 'Bats', self._player_pos.name)
 
     def move_wumpus(self):
         """Depending on difficulty, Wumpus may move after user has taken
-        their action. Wumpus may only move to an empty culvert.
-        Checks if Wumpus met Player."""
-        if self._difficulty > 3:
-            for i in range(0, 3):
-                if self._culverts[i].wumpus:
-                    culvert = self._culverts[i]
-
-                    culvert.wumpus = False
-
-                    destination = random.choice(culvert.neighbors)
-                    while destination.pit or destination.bats:
-                        destination = random.choice(destination.neighbors)
-
-                    destination.wumpus = True
-
-                    self.check_move()
-
-    def player_shoot(self):
-        """Player has requested to shoot. User may control the arrow's direction
-        for three moves. On each move, a call for a check is done, whether the
-        arrow collided with something."""
-        arrow_pos = self._player_pos
-        culvert = ""
-        for i in range(1, 4):
-            if i == 1:
-                culvert = "första"
-            elif i == 2:
-                culvert = "andra"
-            elif i == 3:
-                culvert = "tredje"
-
-            while True:
-                print("\nPilen lämnar " + culvert + " kulverten. Välj nästa kulvert. "
-                                                    "({0}, {1}, {2})".format(*[x.name for x in arrow_pos]))
-
-                destination = self[check_input("Val: ", 1, 20) - 1]
-                if destination not in arrow_pos:
-                    print("Pilar kan inte gå igenom väggar. Än.")
-                else:
-                    arrow_pos = destination
-                    self.arrow_check(arrow_pos)
-                    break
-
-        print("Miss!")
-
-    def arrow_check(self, arrow_pos):
-        """Checks whether the arrow collided with the player or Wumpus.
-        Raises 'PlayerDead' or 'WumpusDead' depending on."""
-        if arrow_pos == self._player_pos:
-            raise PlayerDead("\nKlantigt! Du sköt dig själv med pilen!")
-        elif arrow_pos.wumpus:
-            raise WumpusDead("\nTräff! Du har dödat Wumpus.")
+        their action. Wumpus may only move to an adjacent culvert without
+        bats or pit, and stays if there is none. Checks if Wumpus met Player.
+        Returns the resulting events."""
+        events = []
+        origin = self.board.positions.wumpus
+        if self._difficulty > 3 and origin is not None:
+            safe = self.board.safe(origin)
+            if safe:
+                destination = self.rng.choice(safe)
+                self.board.move(origin, destination, board.WUMPUS)
+                events.append(Event(Event.WUMPUS_MOVED, destination + 1))
+
+                events.extend(self.resolve())
+        return events
+
+    def shoot(self, path):
+        """Player has shot an arrow along the given path of culvert names.
+        The arrow may travel at most three culverts, each one adjacent to the previous.
+        Returns the resulting events."""
+        arrow_pos = self.player_pos
+        events = []
+        for room in path[:3]:
+            if not 1 <= room <= len(self._culverts) or self._culverts[room - 1] not in arrow_pos:
+                events.append(Event(Event.INVALID, room))
+                return events
+
+            arrow_pos = self._culverts[room - 1]
+            events.append(Event(Event.ARROW, room))
+            if arrow_pos == self.player_pos:
+                events.append(Event(Event.SELF_SHOT, room))
+                return events
+            elif arrow_pos.wumpus:
+                events.append(Event(Event.HIT, room))
+                return events
+
+        events.append(Event(Event.MISS, arrow_pos.name))
+        return events
+
+    def arrow_stops(self, culvert):
+        """Checks whether an arrow entering the culvert would hit something."""
+        return culvert == self.player_pos or culvert.wumpus
+
+    def distance(self, origin, destination, cache=True):
+        """Returns the number of steps between two culverts.
+        The distance oracle of the cave is built or loaded on first use,
+        and only kept on disk and in memory if cache is True."""
+        import distance
+        return distance.oracle(self.board.topology, cache=cache).distance(origin.index, destination.index)
 
     def __getitem__(self, item):
         """Allows for iteration over object."""
@@ -304,8 +399,13 @@ class CSC:
 
     @property
     def player_pos(self):
-        """Returns information about the player's position."""
-        return self._player_pos
+        """Returns the culvert the player is in, as kept in the position index."""
+        return self._culverts[self.board.positions.player]
+
+    @player_pos.setter
+    def player_pos(self, culvert):
+        """Moves the player to the given culvert in the position index."""
+        self.board.positions.player = culvert.index
 
     @property
     def difficulty(self):
@@ -330,69 +430,66 @@ class Score:
 
 
 class HighScore:
-    def __init__(self):
-        """Highscore class. Holds all the individual scores.
-        Keeps track of amount of player moves in current session."""
-        self.highscore = []
+    TOP = 10
+
+    def __init__(self, store=None):
+        """Highscore class. Holds the best individual scores, read from the score store.
+        Keeps track of amount of player moves in current session. The score store
+        is opened, and the scores read, the first time they are needed."""
+        self._highscore = None
         self._player_moves = 0
-        self.data = ""
+        self._store = store
+
+    @property
+    def store(self):
+        """Returns the score store, opening the default one on first use."""
+        if self._store is None:
+            from scores import ScoreStore
+            self._store = ScoreStore()
+        return self._store
+
+    @property
+    def highscore(self):
+        """Returns the best scores, loading them on first use."""
+        if self._highscore is None:
+            self.load_highscore()
+        return self._highscore
 
-        self.load_highscore()
+    @highscore.setter
+    def highscore(self, scores):
+        """Replaces the best scores."""
+        self._highscore = scores
 
     def load_highscore(self):
-        """Calls for loading of the highscore file.
-        Creates a Score object for all values in file."""
-        self.data = load_data(HIGHSCORE)
-        for i in range(0, int((len(self.data) - 2) / 2)):
-            self.highscore.append(Score(self.data[1 + i], self.data[(i + 1) + int((len(self.data)) / 2)]))
+        """Calls for the best scores in the score store.
+        Creates a Score object for each of them."""
+        self.highscore = [Score(name, str(moves)) for moves, name in self.store.top(self.TOP)]
 
     def sort(self):
         """Sorts all scores in highscore in rising values."""
         self.highscore.sort(key=lambda x: int(x.score), reverse=False)
 
-    def check_score(self):
-        """The game has ended and player has won. Checks if the amount of moves
-        is lower than the current lowest highscore. If there are more than 10 entries
-        in the highscore - table, the highest score entry is overwritten."""
-        if self._player_moves != 0:
-            if len(self.highscore) == 0 or len(self.highscore) < 10:
-                print("NYTT REKORD!")
-                self.highscore.append(Score(input("Ange ditt namn: "), str(self._player_moves)))
-            else:
-                for i in range(0, len(self.highscore)):
-                    if self._player_moves < int(self.highscore[i].score):
-                        print("NYTT REKORD!")
-                        max_index = self.highscore.index(max(self.highscore, key=attrgetter('score')))
-                        del self.highscore[max_index]
-                        self.highscore.insert(max_index, Score(input("Ange ditt namn: "), str(self._player_moves)))
-                        break
-
-        self.sort()
-        self.save()
-
     def save(self):
-        """Overwrites the existing highscore file with new entries."""
-        with open(os.path.join(ASSET_FOLDER, HIGHSCORE, ), 'r+') as file:
-            file.seek(0)
-            max_index = len(self.highscore)
-            file.write("[Name]\n")
-            for x in range(0, max_index):
-                file.write(self.highscore[x].name + "\n")
-            file.write("[Moves]\n")
-            for x in range(0, max_index):
-                file.write(self.highscore[x].score + "\n")
+        """Merges all new scores into the score store's index."""
+        self.store.compact()
 
     def __str__(self):
         """If there are score entries, the highscore - table is shown.
         Otherwise user is asked for play for results to be showed."""
-        self.sort()
         output('Strings', 'TopScore')
+        return self.table()
+
+    def table(self):
+        """Returns the highscore - table, or a request to play
+        if there are no score entries. PrettyTable is only imported here."""
+        from prettytable import PrettyTable
+        self.sort()
         if len(self.highscore) == 0:
             return "\nDu måste vinna minst en gång för att dina resultat ska visas här."
         else:
             table = PrettyTable(['#', 'Namn', 'Poäng'])
-            for i in range(0, int((len(self.data) - 2) / 2)):
-                table.add_row([str(i + 1) + ".", self.highscore[i].name, self.highscore[i].score])
+            for i, score in enumerate(self.highscore[:self.TOP]):
+                table.add_row([str(i + 1) + ".", score.name, score.score])
 
             return str(table)
 
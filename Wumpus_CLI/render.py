@@ -0,0 +1,170 @@
+"""Terminal rendering. A Screen collects everything written to it until the
+player is asked for input, and then sends it in a single write. After the
+screen has been cleared, the next screen is compared line by line with the
+one before it, and only the lines that differ are sent, placed with cursor
+escape sequences, so that showing the menu again costs next to nothing.
+
+Output that is not a terminal, such as a pipe or a file, gets the plain
+text as it is written, without escape sequences. A socket to a terminal,
+like a telnet client, can be given ansi=True and a line break of its own."""
+
+import os
+import sys
+
+HOME = "\x1b[H"
+ERASE_SCREEN = "\x1b[2J"
+ERASE_LINE = "\x1b[K"
+ERASE_BELOW = "\x1b[J"
+DEFAULT_SIZE = (80, 24)
+
+
+def move_to(row, column=1):
+    """Returns the escape sequence that moves the cursor, counted from 1."""
+    return "\x1b[{0};{1}H".format(row, column)
+
+
+class Screen:
+    """A terminal screen. Keeps the lines currently shown since the last clear,
+    to know what has to be sent when the screen is drawn again. They are
+    None until the screen has been cleared once, as the terminal may show
+    anything before that."""
+    def __init__(self, stream=None, ansi=None, echo=None, size=None, newline="\n"):
+        """The stream defaults to sys.stdout, looked up on every write. Escape
+        sequences are used if ansi is True, or if it is None and the stream is a
+        terminal. Echo tells if the terminal shows the player's answers, which
+        by default it does when standard input is a terminal too."""
+        self._stream = stream
+        self._ansi = ansi
+        self._echo = echo
+        self.size = size
+        self.newline = newline
+
+        self.lines = None
+        self.previous = None
+        self.redraw = False
+        self.pending = []
+
+    @property
+    def stream(self):
+        """Returns the stream written to."""
+        return self._stream if self._stream is not None else sys.stdout
+
+    @property
+    def ansi(self):
+        """Returns True if the screen is drawn with escape sequences."""
+        if self._ansi is not None:
+            return self._ansi
+        return os.name != 'nt' and self.stream.isatty()
+
+    @property
+    def echo(self):
+        """Returns True if the player's answers show up on the screen."""
+        if self._echo is not None:
+            return self._echo
+        return self._stream is not None or sys.stdin.isatty()
+
+    def terminal_size(self):
+        """Returns the columns and rows of the terminal."""
+        if self.size is not None:
+            return self.size
+        if self._stream is None and self.stream.isatty():
+            import shutil
+            return tuple(shutil.get_terminal_size(DEFAULT_SIZE))
+        return DEFAULT_SIZE
+
+    def send(self, text):
+        """Writes text to the stream at once."""
+        if self.newline != "\n":
+            text = text.replace("\n", self.newline)
+        stream = self.stream
+        stream.write(text)
+        stream.flush()
+
+    def put(self, text):
+        """Adds text to the screen. It is sent right away if the screen
+        is not drawn with escape sequences, otherwise on the next flush."""
+        if self.ansi:
+            self.pending.append(text)
+        else:
+            self.send(text)
+
+    def write(self, text=""):
+        """Adds a line of text to the screen, like print."""
+        self.put(str(text) + "\n")
+
+    def clear(self):
+        """Starts a new screen. What has been written so far is sent first.
+        A Windows console without escape sequences is cleared with cls,
+        other output that is not a terminal is left alone."""
+        if self.ansi:
+            self.flush()
+            if not self.redraw:
+                self.previous = self.lines
+                self.lines = [""]
+                self.redraw = True
+        elif os.name == 'nt' and self.stream.isatty():
+            os.system('cls')
+
+    def flush(self):
+        """Sends what has been written since the last flush in one write."""
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        self.pending = []
+        if self.redraw:
+            self.redraw = False
+            text = self.draw(text.split("\n"))
+        else:
+            self.track(text)
+        self.send(text)
+
+    def track(self, text):
+        """Adds text sent without clearing to the lines shown."""
+        if self.lines is None:
+            return
+        lines = text.split("\n")
+        self.lines[-1] += lines[0]
+        self.lines.extend(lines[1:])
+
+    def fits(self, lines):
+        """Checks that every line is shown on a row of its own,
+        without wrapping or scrolling the terminal."""
+        columns, rows = self.terminal_size()
+        return len(lines) <= rows and all(len(line) < columns for line in lines)
+
+    def draw(self, lines):
+        """Returns what has to be sent to show the given lines on a cleared screen.
+        Only the rows that differ from the previous screen are redrawn, unless that
+        screen is unknown or did not fit, when the whole screen is drawn."""
+        previous, self.previous = self.previous, None
+        self.lines = lines
+        if previous is None or not self.fits(previous) or not self.fits(lines):
+            return HOME + ERASE_SCREEN + "\n".join(lines)
+
+        parts = []
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                parts.append(move_to(row + 1) + line + ERASE_LINE)
+        if len(previous) > len(lines):
+            parts.append(move_to(len(lines) + 1) + ERASE_BELOW)
+        parts.append(move_to(len(lines), len(lines[-1]) + 1))
+        return "".join(parts)
+
+    def prompt(self, query):
+        """Shows a question and everything written before it."""
+        self.put(query)
+        self.flush()
+
+    def answered(self, answer):
+        """The player has answered the last question. The answer and the line
+        break after it are on the screen, if the terminal echoes them."""
+        if self.ansi and self.echo and self.lines is not None:
+            self.lines[-1] += answer
+            self.lines.append("")
+
+    def input(self, query=""):
+        """Shows a question and returns the player's answer."""
+        self.prompt(query)
+        answer = input()
+        self.answered(answer)
+        return answer
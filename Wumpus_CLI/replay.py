@@ -0,0 +1,217 @@
+"""Game recordings. A game is recorded as its seed and difficulty followed by
+the player's actions, each a few bytes long, so a game can be played again
+exactly as it was. Recordings are appended to a corpus file, and replayed one
+at a time straight from disk, without prompts or output, so that a corpus of
+any size can be rerun as a regression and performance test of the rules.
+
+A corpus file starts with MAGIC, followed by the games. Every game is stored
+as its length and then its fields, all as unsigned LEB128 varints: the seed,
+the difficulty, the moves taken times two plus one if the game was won, and
+the actions. A move is the culvert name times two, a shot is the length of
+the path times two plus one, followed by the culvert names of the path."""
+
+import argparse
+import random
+import time
+from collections import namedtuple
+from functools import partial
+
+from engine import Engine, Move, Shoot
+from objects import CSC
+from board import SEED_BITS, derive_seed
+
+MAGIC = b'WRC1'
+LIMIT = 200
+
+Recording = namedtuple('Recording', 'seed difficulty won moves actions')
+Recording.__doc__ = """A recorded game. The outcome is what it was when it was recorded."""
+
+
+class BadRecording(Exception):
+    """Raised when a file is not a corpus or a recording is cut off."""
+
+
+def write_varint(buffer, value):
+    """Appends an unsigned integer to the buffer, seven bits per byte."""
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position):
+    """Reads an unsigned integer from data at the given position.
+    Returns the integer and the position after it."""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode(seed, difficulty, won, moves, actions):
+    """Returns a recorded game as bytes, without its length."""
+    buffer = bytearray()
+    write_varint(buffer, seed)
+    write_varint(buffer, difficulty)
+    write_varint(buffer, moves << 1 | bool(won))
+    for action in actions:
+        if isinstance(action, Shoot):
+            write_varint(buffer, len(action.path) << 1 | 1)
+            for room in action.path:
+                write_varint(buffer, room)
+        else:
+            write_varint(buffer, action.room << 1)
+    return buffer
+
+
+def decode(data):
+    """Returns the recording stored in the given bytes."""
+    seed, position = read_varint(data, 0)
+    difficulty, position = read_varint(data, position)
+    outcome, position = read_varint(data, position)
+
+    actions = []
+    while position < len(data):
+        value, position = read_varint(data, position)
+        if value & 1:
+            path = []
+            for _ in range(value >> 1):
+                room, position = read_varint(data, position)
+                path.append(room)
+            actions.append(Shoot(path))
+        else:
+            actions.append(Move(value >> 1))
+    return Recording(seed, difficulty, bool(outcome & 1), outcome >> 1, actions)
+
+
+class Recorder:
+    """Records games to a corpus file, appending to it if it exists.
+    A game is only written once it has ended, in a single write."""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.seed = self.difficulty = None
+        self.actions = []
+
+    def start(self, csc):
+        """Starts recording a new game on the given CSC."""
+        self.seed, self.difficulty = csc.seed, csc.difficulty
+        self.actions = []
+
+    def action(self, action):
+        """Records an action of the player, a Move or a Shoot."""
+        self.actions.append(action)
+
+    def finish(self, engine):
+        """The game has ended. Writes it to the corpus with its outcome."""
+        body = encode(self.seed, self.difficulty, engine.won, engine.moves, self.actions)
+        record = bytearray()
+        write_varint(record, len(body))
+        self.file.write(record + body)
+        self.file.flush()
+        self.actions = []
+
+    def close(self):
+        """Closes the corpus file."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read(path):
+    """Iterates over the recordings of a corpus file, reading one at a time."""
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise BadRecording("Not a recording corpus: " + path)
+        while True:
+            length = shift = 0
+            while True:
+                byte = file.read(1)
+                if not byte:
+                    if shift:
+                        raise BadRecording("Recording cut off in " + path)
+                    return
+                length |= (byte[0] & 0x7F) << shift
+                shift += 7
+                if byte[0] < 0x80:
+                    break
+            data = file.read(length)
+            if len(data) != length:
+                raise BadRecording("Recording cut off in " + path)
+            yield decode(data)
+
+
+def play(recording):
+    """Plays a recording again. Returns the engine, after the game."""
+    engine = Engine(CSC(recording.difficulty, seed=recording.seed))
+    for action in recording.actions:
+        engine.step(action)
+    return engine
+
+
+def verify(path, limit=10):
+    """Replays every game in a corpus and compares the outcomes with the recorded
+    ones. Returns the number of games and actions, the time taken and the first
+    games, by number, that did not end the same way."""
+    games = actions = 0
+    mismatches = []
+    start = time.perf_counter()
+    for number, recording in enumerate(read(path)):
+        engine = play(recording)
+        games += 1
+        actions += len(recording.actions)
+        if (engine.won, engine.moves) != (recording.won, recording.moves) and len(mismatches) < limit:
+            mismatches.append(number)
+    return games, actions, time.perf_counter() - start, mismatches
+
+
+def generate(path, games, difficulty=3, policy='random', seed=0):
+    """Records the given number of games played by a scripted policy
+    of the difficulty analyzer."""
+    from analyze import POLICIES
+    policy = partial(POLICIES[policy], rng=random.Random(derive_seed(seed, difficulty, 'policy')))
+    seeds = random.Random(derive_seed(seed, difficulty))
+    with Recorder(path) as recorder:
+        for _ in range(games):
+            engine = Engine(CSC(difficulty, seed=seeds.getrandbits(SEED_BITS)))
+            recorder.start(engine.csc)
+            while not engine.over and engine.moves < LIMIT:
+                action = policy(engine)
+                recorder.action(action)
+                engine.step(action)
+            recorder.finish(engine)
+
+
+def main():
+    """Reads the arguments. Records a corpus if asked to, then replays it."""
+    parser = argparse.ArgumentParser(description="Replays recorded games and checks their outcomes.")
+    parser.add_argument('corpus', help="corpus file")
+    parser.add_argument('-g', '--generate', type=int, default=0, help="first record this many scripted games")
+    parser.add_argument('-d', '--difficulty', type=int, default=3, help="difficulty of generated games")
+    parser.add_argument('-p', '--policy', default='random', help="policy of generated games")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of generated games")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate(args.corpus, args.generate, args.difficulty, args.policy, args.seed)
+
+    games, actions, seconds, mismatches = verify(args.corpus)
+    print("Replayed {0} games, {1} actions in {2:.2f} s ({3:.0f} games per second).".format(
+        games, actions, seconds, games / seconds if seconds else 0.0))
+    for number in mismatches:
+        print("Game {0} did not end as recorded.".format(number))
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Highscore store. New scores are appended to a log file, and from time to time
+the log is merged into an index file holding all scores sorted by moves. Adding a
+score only appends a line, and reading the top scores only reads the beginning of
+the index and the (short) log, so the store stays fast with millions of scores.
+
+Several processes may share a store. Every read and write is done under a lock
+file, the index and a fresh log are only written whole through a rename, and
+log lines are flushed to disk before the lock is released. Each merge starts a
+new generation, named in the headers of both files, so a log that was already
+merged when a process crashed is recognised and not counted twice."""
+
+import bisect
+import heapq
+import itertools
+import os
+
+from filelock import FileLock, atomic_write
+from modules import ASSET_FOLDER, HIGHSCORE
+
+HIGHSCORE_LOG = "highscore.log"
+HIGHSCORE_INDEX = "highscore.idx"
+HIGHSCORE_LOCK = "highscore.lock"
+INDEX_HEADER = "#WUMPUS-INDEX 1 "
+LOG_HEADER = "#WUMPUS-LOG 1 "
+
+# Number of scores in the log before it is merged into the index, at least,
+# and at most a share of the index size so that merges stay rare as it grows.
+COMPACT_AT = 1000
+COMPACT_SHARE = 8
+
+
+def encode(moves, name):
+    """Returns the line a score is stored as. Tabs and line breaks
+    in the name are replaced by spaces."""
+    name = name.replace("\t", " ").replace("\r", " ").replace("\n", " ")
+    return "{0}\t{1}\n".format(moves, name)
+
+
+def decode(line):
+    """Returns the (moves, name) of a stored line."""
+    moves, _, name = line.rstrip("\n").partition("\t")
+    return int(moves), name
+
+
+def parse_legacy(lines):
+    """Parses the old highscore format, a [Name] block followed by
+    a [Moves] block. Returns a list of (moves, name)."""
+    if "[Name]" not in lines or "[Moves]" not in lines:
+        return []
+    split = lines.index("[Moves]")
+    names = lines[lines.index("[Name]") + 1:split]
+    moves = lines[split + 1:split + 1 + len(names)]
+    return [(int(m), n) for n, m in zip(names, moves) if m.strip().isdigit()]
+
+
+class ScoreStore:
+    """Holds all scores. The log is kept in memory, sorted, while the index
+    is only read from disk when needed. Before every operation the store
+    catches up with what other processes have written since."""
+    def __init__(self, folder=ASSET_FOLDER, compact_at=COMPACT_AT):
+        self.log_path = os.path.join(folder, HIGHSCORE_LOG)
+        self.index_path = os.path.join(folder, HIGHSCORE_INDEX)
+        self.legacy_path = os.path.join(folder, HIGHSCORE)
+        self.lock = FileLock(os.path.join(folder, HIGHSCORE_LOCK))
+        self.compact_at = compact_at
+
+        self.recent = []
+        self.indexed = 0
+        self.generation = None
+        self._sequence = itertools.count()
+
+        # Identity of the log file that has been read, how far, and whether
+        # it can be appended to as it is.
+        self._log_id = None
+        self._offset = 0
+        self._appendable = False
+
+        self.load()
+
+    def load(self):
+        """Reads the log and the size of the index. On first load, migrates
+        scores from the old highscore file if there is one."""
+        with self.lock:
+            if not os.path.exists(self.log_path) and not os.path.exists(self.index_path):
+                self.migrate()
+            self.sync()
+
+    def migrate(self):
+        """Writes the scores of the old highscore file to the index."""
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as file:
+                scores = parse_legacy(file.read().splitlines())
+        except IOError:
+            return
+        self.write_index(sorted(scores, key=lambda score: score[0]), len(scores), 0)
+
+    def read_header(self):
+        """Returns the number of scores in the index and its generation."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                header = file.readline()
+        except IOError:
+            return 0, 0
+        if not header.startswith(INDEX_HEADER):
+            return 0, 0
+        fields = header[len(INDEX_HEADER):].split()
+        return int(fields[0]), int(fields[1]) if len(fields) > 1 else 0
+
+    def sync(self):
+        """Catches up with the files on disk. Must be called with the lock held.
+        Only the part of the log that has not been read yet is read, unless the
+        index has been merged or the log replaced by another process."""
+        count, generation = self.read_header()
+        try:
+            file = open(self.log_path, 'rb')
+        except IOError:
+            file = None
+
+        log_id = None
+        if file is not None:
+            status = os.fstat(file.fileno())
+            log_id = (status.st_dev, status.st_ino)
+        if generation != self.generation or log_id != self._log_id:
+            self.generation, self.indexed = generation, count
+            self._log_id, self._offset = log_id, 0
+            self.recent = []
+            self._appendable = False
+        if file is None:
+            return
+
+        with file:
+            file.seek(self._offset)
+            if self._offset == 0:
+                header = file.readline()
+                if not header.startswith(LOG_HEADER.encode()):
+                    file.seek(0)
+                elif int(header[len(LOG_HEADER):]) < generation:
+                    # Already merged by a process that crashed before it
+                    # could start the new log, so none of it is read.
+                    self._offset = os.fstat(file.fileno()).st_size
+                    return
+                self._appendable = True
+
+            data = file.read()
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].decode('utf-8').splitlines():
+                moves, name = decode(line)
+                bisect.insort(self.recent, (moves, next(self._sequence), name))
+            self._offset = file.tell() - len(data) + end
+            # A line cut off by a crash must be removed before appending.
+            if end != len(data):
+                self._appendable = False
+
+    def start_log(self):
+        """Replaces the log with one holding the header of the current generation
+        and the scores read so far. Must be called with the lock held."""
+        lines = [LOG_HEADER + str(self.generation) + "\n"]
+        lines.extend(encode(moves, name) for moves, _, name in self.recent)
+        atomic_write(self.log_path, lines)
+
+        status = os.stat(self.log_path)
+        self._log_id = (status.st_dev, status.st_ino)
+        self._offset = status.st_size
+        self._appendable = True
+
+    def indexed_scores(self):
+        """Iterates over the scores of the index, lowest moves first."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                if not file.readline().startswith(INDEX_HEADER):
+                    return
+                for line in file:
+                    yield decode(line)
+        except IOError:
+            return
+
+    def scores(self):
+        """Iterates over all scores, lowest moves first. Scores with
+        the same moves are in the order they were added."""
+        recent = ((moves, name) for moves, _, name in self.recent)
+        return heapq.merge(self.indexed_scores(), recent, key=lambda score: score[0])
+
+    def top(self, count=10):
+        """Returns the given number of best scores as (moves, name)."""
+        with self.lock:
+            self.sync()
+            return list(itertools.islice(self.scores(), count))
+
+    def qualifies(self, moves, count=10):
+        """Checks if a score with the given moves would make the top list."""
+        best = self.top(count)
+        return len(best) < count or moves < best[-1][0]
+
+    def add(self, name, moves):
+        """Appends a score to the log and flushes it to disk. Merges the
+        log into the index when it has grown large enough."""
+        line = encode(moves, name).encode('utf-8')
+        with self.lock:
+            self.sync()
+            if not self._appendable:
+                self.start_log()
+            with open(self.log_path, 'ab') as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+            self._offset += len(line)
+            bisect.insort(self.recent, (moves, next(self._sequence), name))
+
+            if len(self.recent) >= max(self.compact_at, self.indexed // COMPACT_SHARE):
+                self.merge()
+
+    def write_index(self, scores, count, generation):
+        """Writes the given sorted scores as the new index."""
+        header = INDEX_HEADER + "{0} {1}\n".format(count, generation)
+        atomic_write(self.index_path, itertools.chain([header], (encode(moves, name) for moves, name in scores)))
+
+    def merge(self):
+        """Merges the log into the index as a new generation and starts
+        an empty log. Must be called with the lock held."""
+        self.write_index(self.scores(), len(self), self.generation + 1)
+        self.generation += 1
+        self.indexed += len(self.recent)
+        self.recent = []
+        self.start_log()
+
+    def compact(self):
+        """Merges the log into the index, if it holds any scores."""
+        with self.lock:
+            self.sync()
+            if self.recent:
+                self.merge()
+
+    def __len__(self):
+        """Returns the number of scores."""
+        return self.indexed + len(self.recent)
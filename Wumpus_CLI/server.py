@@ -0,0 +1,144 @@
+"""Game server. Hosts many players in one process over TCP, e.g. with telnet.
+Every connection is a session with its own CSC and HighScore, driven by the
+game engine, while all sessions share the string catalog and the score store.
+Waiting for a player costs no more than a suspended coroutine, so thousands
+of idle sessions fit on one core. Score store calls touch the disk and are
+run on a single worker thread, one at a time, to keep the game loop free."""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from flow import Flow, Ask
+from modules import CATALOG
+from scores import ScoreStore
+from render import Screen
+
+HOST = "127.0.0.1"
+PORT = 2323
+ENCODING = 'utf-8'
+
+
+class Disconnected(Exception):
+    """Raised when the player closes the connection."""
+
+
+class Connection:
+    """The stream a session's screen writes to. Encodes text onto the
+    connection, which is drained when the player is asked for input."""
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, text):
+        self.writer.write(text.encode(ENCODING))
+
+    def flush(self):
+        pass
+
+
+class Session(Flow):
+    """One connected player. Goes through the same menu and games as the CLI,
+    but reads from and writes to the connection instead of the terminal."""
+    def __init__(self, server, reader, writer):
+        Flow.__init__(self, Screen(Connection(writer), ansi=True, newline="\r\n"), server.store)
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+
+    async def input(self, query):
+        """Sends the screen with the query and waits for the player's answer."""
+        self.screen.prompt(query)
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise Disconnected()
+        answer = line.decode(ENCODING, 'ignore').strip()
+        self.screen.answered(answer)
+        return answer
+
+    async def run(self):
+        """Main session loop. Drives the flow until the player quits or leaves,
+        answering its questions from the connection and running its score store
+        calls on the server's worker thread."""
+        steps = self.menu()
+        try:
+            request = next(steps)
+            while True:
+                if isinstance(request, Ask):
+                    answer = await self.input(request.query)
+                else:
+                    answer = await self.server.call(request.function, *request.args)
+                request = steps.send(answer)
+        except StopIteration:
+            self.screen.flush()
+
+
+class Server:
+    """Accepts connections and runs a session for each of them.
+    Keeps count of the sessions and the games played."""
+    def __init__(self, store=None):
+        self.store = store if store is not None else ScoreStore()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.sessions = set()
+        self.served = 0
+        self.server = None
+
+    def call(self, function, *args):
+        """Runs a blocking score store call on the worker thread. Returns a future."""
+        return asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def handle(self, reader, writer):
+        """Runs a session for a new connection and closes it afterwards."""
+        session = Session(self, reader, writer)
+        self.sessions.add(session)
+        self.served += 1
+        try:
+            await session.run()
+            await writer.drain()
+        except (Disconnected, ConnectionError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT, backlog=1024):
+        """Starts listening for connections."""
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=backlog)
+        return self.server
+
+    async def stop(self):
+        """Stops listening, and merges new scores into the store's index."""
+        self.server.close()
+        await self.server.wait_closed()
+        await self.call(self.store.compact)
+        self.executor.shutdown()
+
+
+async def serve(host, port):
+    """Serves until cancelled, then stops the server."""
+    server = Server()
+    listener = await server.start(host, port)
+    print("Serving on " + ", ".join(str(s.getsockname()) for s in listener.sockets))
+    try:
+        await listener.serve_forever()
+    finally:
+        print("Served {0} sessions, {1} still connected.".format(server.served, len(server.sessions)))
+        await server.stop()
+
+
+def main():
+    """Reads the arguments and serves until interrupted."""
+    parser = argparse.ArgumentParser(description="Hosts Wumpus games over TCP.")
+    parser.add_argument('--host', default=HOST, help="address to listen on")
+    parser.add_argument('-p', '--port', type=int, default=PORT, help="port to listen on")
+    args = parser.parse_args()
+
+    CATALOG.load()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Highscore stress test. Starts many writer processes that add scores to the
+same score store at once, optionally kills some of them midway, and checks
+afterwards that no score was lost, counted twice or damaged."""
+
+import argparse
+import os
+import random
+import shutil
+import signal
+import tempfile
+import time
+from collections import Counter
+from multiprocessing import Process, Value
+
+from scores import ScoreStore
+
+WRITERS = 16
+SCORES = 200
+COMPACT_AT = 50
+
+
+def writer(folder, number, count, compact_at, done):
+    """Worker function. Adds the given number of scores named after the writer,
+    counting in done how many have been added."""
+    rng = random.Random(number)
+    store = ScoreStore(folder, compact_at)
+    for i in range(count):
+        store.add("w{0}-{1}".format(number, i), rng.randint(1, 100))
+        done.value = i + 1
+
+
+def verify(folder, writers, count, done, killed):
+    """Returns a list of problems found in the store. Every score a writer has
+    finished adding must be there exactly once. A killed writer may also have
+    written the score it was adding when it died, but nothing after it."""
+    store = ScoreStore(folder)
+    scores = list(store.scores())
+    problems = []
+
+    moves = [score[0] for score in scores]
+    if moves != sorted(moves):
+        problems.append("Scores are not sorted.")
+    if len(scores) != len(store):
+        problems.append("Store holds {0} scores but counts {1}.".format(len(scores), len(store)))
+
+    names = Counter(name for _, name in scores)
+    for name, times in names.items():
+        if times > 1:
+            problems.append("{0} was stored {1} times.".format(name, times))
+
+    for number in range(writers):
+        added = sum(1 for i in range(count) if "w{0}-{1}".format(number, i) in names)
+        least = done[number].value
+        most = least + 1 if number in killed and least < count else least
+        if not least <= added <= most:
+            problems.append("Writer {0} added {1} scores, {2} were stored.".format(number, least, added))
+    return problems
+
+
+def stress(writers=WRITERS, count=SCORES, compact_at=COMPACT_AT, kills=0, folder=None, seed=None):
+    """Runs the stress test in the given folder, a temporary one by default.
+    Returns the number of stored scores, submissions per second and the problems found."""
+    rng = random.Random(seed)
+    temporary = folder is None
+    if temporary:
+        folder = tempfile.mkdtemp()
+
+    try:
+        done = [Value('i', 0, lock=False) for _ in range(writers)]
+        processes = [Process(target=writer, args=(folder, number, count, compact_at, done[number]))
+                     for number in range(writers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        killed = set(rng.sample(range(writers), min(kills, writers)))
+        for number in killed:
+            # Waits for the writer to get going, then kills it without warning.
+            target = rng.randint(1, count)
+            while done[number].value < target and processes[number].is_alive():
+                time.sleep(0.001)
+            os.kill(processes[number].pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        problems = verify(folder, writers, count, done, killed)
+        for number, process in enumerate(processes):
+            if number not in killed and process.exitcode != 0:
+                problems.append("Writer {0} failed.".format(number))
+
+        stored = sum(counter.value for counter in done)
+        return stored, stored / elapsed, problems
+    finally:
+        if temporary:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    """Reads the arguments, runs the stress test and prints the result."""
+    parser = argparse.ArgumentParser(description="Stress tests concurrent highscore writes.")
+    parser.add_argument('-w', '--writers', type=int, default=WRITERS, help="writer processes")
+    parser.add_argument('-n', '--scores', type=int, default=SCORES, help="scores per writer")
+    parser.add_argument('-c', '--compact', type=int, default=COMPACT_AT, help="log size before merging")
+    parser.add_argument('-k', '--kill', type=int, default=0, help="writers to kill midway")
+    parser.add_argument('-f', '--folder', help="store folder, a temporary one by default")
+    parser.add_argument('-s', '--seed', type=int, help="seed for which writers are killed and when")
+    args = parser.parse_args()
+
+    stored, rate, problems = stress(args.writers, args.scores, args.compact, args.kill, args.folder, args.seed)
+    print("{0} scores from {1} writers, {2:.0f} per second.".format(stored, args.writers, rate))
+    for problem in problems:
+        print(problem)
+    print("FAILED" if problems else "OK")
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Cave topologies. The adjacency of a cave is stored in CSR form: an array of
+offsets, one per culvert plus one, into an array of neighbor indexes. Memory
+is linear in the number of culverts, so caves with millions of culverts fit.
+Besides the 20 culvert scheme of the original game, random connected caves
+of any size can be generated from a seed."""
+
+import random
+from array import array
+from collections import deque
+
+SCHEME = ((1, 5, 4), (0, 7, 2), (1, 9, 3), (2, 11, 4),
+          (3, 13, 0), (0, 14, 6), (5, 16, 7), (1, 6, 8),
+          (7, 9, 17), (2, 8, 10), (9, 11, 18), (10, 3, 12),
+          (19, 11, 13), (14, 12, 4), (13, 5, 15), (14, 19, 16),
+          (6, 15, 17), (16, 8, 18), (10, 17, 19), (12, 15, 18))
+
+# Caves up to this size keep their neighbors as tuples for faster lookups.
+ROWS_LIMIT = 4096
+
+# Attempts to swap partners before an edge that would be duplicated is dropped.
+SWAP_ATTEMPTS = 8
+
+
+class Topology:
+    """The layout of a cave, shared between all boards using it.
+    Must not be modified once created."""
+    def __init__(self, offsets, targets, seed=None):
+        self.offsets = offsets
+        self.targets = targets
+        self.seed = seed
+        self.size = len(offsets) - 1
+        self._digest = None
+
+        self._rows = None
+        if self.size <= ROWS_LIMIT:
+            self._rows = tuple(tuple(targets[offsets[i]:offsets[i + 1]]) for i in range(self.size))
+
+    @classmethod
+    def from_rows(cls, rows, seed=None):
+        """Creates a topology from a sequence of neighbor lists."""
+        offsets = array('i', [0])
+        targets = array('i')
+        for row in rows:
+            targets.extend(row)
+            offsets.append(len(targets))
+        return cls(offsets, targets, seed)
+
+    @classmethod
+    def generate(cls, size, degree=3, seed=None):
+        """Generates a random connected cave of the given size from a seed.
+        All culverts are joined in one random cycle, which keeps the cave connected,
+        and every further degree adds a random matching of the culverts. Edges that
+        would connect a culvert to itself or duplicate another edge are swapped away,
+        or dropped if that fails, so a few culverts may have a lower degree."""
+        if degree < 2:
+            raise ValueError("Degree must be at least 2.")
+        if size <= degree:
+            raise ValueError("A cave needs more culverts than its degree.")
+
+        rng = random.Random(seed)
+        order = list(range(size))
+        rng.shuffle(order)
+        position = [0] * size
+        for i, culvert in enumerate(order):
+            position[culvert] = i
+
+        # Every culvert has one partner per matching, -1 when it has none.
+        matchings = []
+        last = size - 1
+
+        def connected(a, b):
+            """Checks if a and b are the same culvert or already have an edge."""
+            distance = abs(position[a] - position[b])
+            if distance <= 1 or distance == last:
+                return True
+            for partner in matchings:
+                if partner[a] == b:
+                    return True
+            return False
+
+        for _ in range(degree - 2):
+            pairs = list(range(size))
+            rng.shuffle(pairs)
+            count = size // 2
+            partner = [-1] * size
+            for j in range(count):
+                a, b = pairs[2 * j], pairs[2 * j + 1]
+                if connected(a, b):
+                    # Swap partners with a pair that has not been joined yet.
+                    for attempt in range(SWAP_ATTEMPTS):
+                        k = rng.randrange(j, count)
+                        c, d = pairs[2 * k], pairs[2 * k + 1]
+                        if not connected(a, d) and not connected(c, b):
+                            pairs[2 * j + 1], pairs[2 * k + 1] = d, b
+                            b = d
+                            break
+                    else:
+                        continue
+                partner[a] = b
+                partner[b] = a
+            matchings.append(partner)
+
+        previous = [0] * size
+        following = [0] * size
+        for i, culvert in enumerate(order):
+            previous[culvert] = order[i - 1]
+            following[culvert] = order[i + 1 - size]
+
+        columns = [previous, following] + matchings
+        if all(partner.count(-1) == 0 for partner in matchings):
+            targets = array('i', [n for row in zip(*columns) for n in row])
+            offsets = array('i', range(0, len(targets) + 1, degree))
+        else:
+            targets = array('i', [n for row in zip(*columns) for n in row if n >= 0])
+            offsets = array('i', [0]) * (size + 1)
+            fill = 0
+            for culvert, row in enumerate(zip(*matchings)):
+                fill += 2 + len(row) - row.count(-1)
+                offsets[culvert + 1] = fill
+
+        return cls(offsets, targets, seed)
+
+    def __len__(self):
+        """Returns the number of culverts."""
+        return self.size
+
+    def neighbors(self, index):
+        """Returns the indexes of the culverts adjacent to the given one."""
+        if self._rows is not None:
+            return self._rows[index]
+        return tuple(self.targets[self.offsets[index]:self.offsets[index + 1]])
+
+    def digest(self):
+        """Returns a hash of the adjacency, identifying the topology on disk."""
+        if self._digest is None:
+            import hashlib
+            digest = hashlib.sha1(self.offsets.tobytes())
+            digest.update(self.targets.tobytes())
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    @property
+    def degree(self):
+        """Returns the highest number of neighbors of any culvert."""
+        offsets = self.offsets
+        return max(offsets[i + 1] - offsets[i] for i in range(self.size))
+
+    def is_connected(self):
+        """Checks that every culvert can be reached from the first one."""
+        offsets, targets = self.offsets, self.targets
+        seen = bytearray(self.size)
+        seen[0] = 1
+        queue = deque([0])
+        while queue:
+            culvert = queue.popleft()
+            for neighbor in targets[offsets[culvert]:offsets[culvert + 1]]:
+                if not seen[neighbor]:
+                    seen[neighbor] = 1
+                    queue.append(neighbor)
+        return seen.count(1) == self.size
+
+    def as_numpy(self):
+        """Returns the adjacency as a NumPy array of shape (N, degree), without copying.
+        Only possible if all culverts have the same number of neighbors."""
+        import numpy as np
+        if len(self.targets) != self.size * self.degree:
+            raise ValueError("Culverts have different numbers of neighbors.")
+        return np.frombuffer(self.targets, dtype=np.int32).reshape(self.size, -1)
+
+
+DODECAHEDRON = Topology.from_rows(SCHEME)
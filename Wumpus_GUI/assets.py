@@ -0,0 +1,128 @@
+"""Asset manager. Every image is loaded from disk and converted to the pixel
+format of the display once, and then handed out from memory, so that drawing
+never waits for the disk and blits need no conversion. The surfaces handed out
+are shared and must not be changed. A sprite that needs an image with another
+alpha gets a copy, which is made once and shared as well, as do the tiles of
+the floor, unlit and lit.
+
+Running this file preloads all images and prints how long each one took to
+load and how much memory it holds."""
+
+import os
+import time
+
+from settings import pg, IMAGE, IMAGES
+from instrument import INSTRUMENTS
+
+
+class Assets:
+    """Cache of converted images, by file name. Also keeps how long
+    each image took to load and convert, in seconds."""
+    def __init__(self, folder=IMAGE):
+        self.folder = folder
+        self.images = {}
+        self.load_times = {}
+        self.variants = {}
+
+    def load(self, file):
+        """Loads an image from disk. It is converted and kept if the display
+        has been set up, as converting needs its pixel format."""
+        start = time.perf_counter()
+        with INSTRUMENTS.phase('image_load'):
+            image = pg.image.load(os.path.join(self.folder, file))
+        if pg.display.get_surface() is None:
+            return image
+        if image.get_flags() & pg.SRCALPHA:
+            image = image.convert_alpha()
+        else:
+            image = image.convert()
+        self.images[file] = image
+        self.load_times[file] = time.perf_counter() - start
+        return image
+
+    def preload(self, files=IMAGES):
+        """Loads every given image that is not loaded yet."""
+        for file in files:
+            if file not in self.images:
+                self.load(file)
+
+    def image(self, file):
+        """Returns the image, loading it on first use."""
+        image = self.images.get(file)
+        if image is None:
+            image = self.load(file)
+        return image
+
+    def with_alpha(self, image, alpha):
+        """Returns the image with the given alpha. Unless it already has it,
+        that is a copy, kept with the image it was made from."""
+        if image.get_alpha() == alpha:
+            return image
+        key = id(image), alpha
+        variant = self.variants.get(key)
+        if variant is None or variant[0] is not image:
+            copy = image.copy()
+            copy.set_alpha(alpha)
+            variant = self.variants[key] = image, copy
+        return variant[1]
+
+    def lighting(self, image):
+        """Returns the image as a tile of the floor, unlit and lit: as it shows on
+        the empty floor, and the same made opaque. The unlit tile is None if it
+        does not show at all. Opaque tiles are converted to the pixel format of
+        the display, without alpha, to be blitted fast. Both are made once, and
+        kept with the image."""
+        key = id(image), 'lighting'
+        variant = self.variants.get(key)
+        if variant is None or variant[0] is not image:
+            unlit = pg.Surface(image.get_size(), pg.SRCALPHA)
+            unlit.blit(image, (0, 0))
+            INSTRUMENTS.count('surface_allocations', 2)
+            if pg.display.get_surface() is not None:
+                lit = unlit.convert()
+                if pg.mask.from_surface(unlit, 254).count() == unlit.get_width() * unlit.get_height():
+                    unlit = lit
+            else:
+                lit = unlit.copy()
+                lit.fill((0, 0, 0, 255), special_flags=pg.BLEND_RGBA_MAX)
+            if not unlit.get_bounding_rect():
+                unlit = None
+            variant = self.variants[key] = image, (unlit, lit)
+        return variant[1]
+
+    def memory(self, file):
+        """Returns the bytes of pixel data the image holds."""
+        image = self.images[file]
+        return image.get_pitch() * image.get_height()
+
+    def report(self):
+        """Returns the size, load time in ms and memory in bytes
+        of every loaded image, by file name."""
+        return {file: {'size': image.get_size(),
+                       'load_ms': round(self.load_times[file] * 1000, 3),
+                       'bytes': self.memory(file)}
+                for file, image in self.images.items()}
+
+    def clear(self):
+        """Forgets all images, e.g. after the display has changed."""
+        self.images.clear()
+        self.load_times.clear()
+        self.variants.clear()
+
+
+IMAGE_CACHE = Assets()
+
+
+if __name__ == "__main__":
+    """Preloads all images on a hidden display and prints the report."""
+    from replay import headless
+    from settings import WIDTH, HEIGHT
+    headless()
+    pg.display.set_mode((WIDTH, HEIGHT))
+    IMAGE_CACHE.preload()
+    report = IMAGE_CACHE.report()
+    for file in sorted(report):
+        print("{0:<22} {1[0]:>5}x{1[1]:<4} {2:>8.3f} ms {3:>9} bytes".format(
+            file, report[file]['size'], report[file]['load_ms'], report[file]['bytes']))
+    print("{0} images, {1:.3f} ms, {2} bytes".format(
+        len(report), sum(r['load_ms'] for r in report.values()), sum(r['bytes'] for r in report.values())))
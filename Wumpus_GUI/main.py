@@ -3,23 +3,50 @@
 # 2016/12/07
 # Ver. 1.0.1 - GUI
 
+import argparse
+
 from settings import *
 from objects import *
+from allocator import Allocator
+from instrument import INSTRUMENTS
+from text import TEXT
+from scheduler import Scheduler
+from renderer import Renderer, Item, blit
+from occupancy import Occupancy
 
 
 class Game(object):
-    def __init__(self):
-        """Initialize Game Object"""
+    def __init__(self, seed=None, record=None, fps=FPS, debug=False):
+        """Initialize Game Object. Every game gets its own seed, drawn from
+        a generator that may be seeded to replay a session. If a corpus file
+        is given, every finished game is recorded to it. Frames are drawn at
+        most fps times a second, and only when something has changed. Only the
+        changed parts of the screen are drawn, outlined if debug is True."""
         pg.init()
         pg.display.set_caption(TITLE)
         self.running = True
 
         self.screen = pg.display.set_mode((WIDTH, HEIGHT))
         self.background = pg.Surface((WIDTH, HEIGHT))
+        INSTRUMENTS.count('surface_allocations')
         self.background.fill(BLACK)
-        self.background.convert()
+        self.background = self.background.convert()
+        IMAGE_CACHE.preload()
 
         self.difficulty = DIFFICULTY
+        self.seeds = random.Random(seed)
+        self.recorder = None
+        if record:
+            from replay import Recorder
+            self.recorder = Recorder(record)
+        self.headless = False
+        self.scheduler = Scheduler(fps)
+        self.renderer = Renderer(self.screen, debug)
+
+        self.revealed_floor = Floor(self, load_asset(IMAGE, TILE), LIGHT_FULL, GRIDWIDTH, GRIDHEIGHT)
+        self.revealed = pg.Surface(self.revealed_floor.rect.size).convert()
+        INSTRUMENTS.count('surface_allocations')
+        self.revealed_state = None
         self.load_highscore()
 
     def new(self):
@@ -29,12 +56,19 @@ class Game(object):
         self.initialize_values()
         self.difficulty_modifier()
         self.initialize_sprites()
+        if self.recorder:
+            self.recorder.start(self)
 
         self.main()
 
-    def initialize_values(self):
-        """Initializes/Resets all values to given/default."""
+    def initialize_values(self, seed=None):
+        """Initializes/Resets all values to given/default. Draws the seed of
+        the new game, unless it is given, all its randomness comes from
+        a generator seeded with it."""
+        self.seed = seed if seed is not None else self.seeds.getrandbits(SEED_BITS)
+        self.rng = random.Random(self.seed)
         self.draw_all = False
+        self.cause = None
 
         self.moves = 0
         self.arrows = ARROWS
@@ -50,7 +84,11 @@ class Game(object):
         self.bats_hit = []
 
     def initialize_sprites(self):
-        """Initializes all sprite groups and populates then."""
+        """Initializes all sprite groups and populates then. Entities are
+        placed in free tiles, each tile holding at most one of them, and
+        entered into the occupancy grid."""
+        self.tiles = Allocator(int(GRIDWIDTH * GRIDHEIGHT), self.rng)
+        self.occupancy = Occupancy(int(GRIDWIDTH), int(GRIDHEIGHT))
         self.wumpus_sprite = pg.sprite.GroupSingle()
         self.bat_sprites = pg.sprite.Group()
         self.pit_sprites = pg.sprite.Group()
@@ -67,22 +105,35 @@ class Game(object):
         self.player_sprite.add(Player(self, load_asset(IMAGE, PLAYER), LIGHT_FULL))
 
         self.floor_sprite = pg.sprite.GroupSingle()
-        self.floor_sprite.add(Floor(game, load_asset(IMAGE, TILE), LIGHT_NULL, GRIDWIDTH, GRIDHEIGHT))
+        self.floor_sprite.add(Floor(self, load_asset(IMAGE, TILE), LIGHT_NULL, GRIDWIDTH, GRIDHEIGHT))
         self.floor_sprite.update(self.player_sprite.sprite.rect)
 
     def main(self):
-        """Main loop - While the user wants to play - calls for input, updates and drawing."""
+        """Main loop - While the user wants to play - calls for input, updates and drawing.
+        Waits for the player while nothing has changed, and only then draws a new frame.
+        Handling input, updating and drawing are timed as phases, as is the whole frame."""
         self.running = True
+        self.scheduler.mark()
+        self.renderer.invalidate()
 
         while self.playing:
-            self.input()
-            self.update()
-            self.draw()
-
-    def input(self):
+            events = self.scheduler.events()
+            with INSTRUMENTS.phase('input'):
+                self.input(events)
+            if self.playing and self.scheduler.redraw():
+                with INSTRUMENTS.phase('frame'):
+                    with INSTRUMENTS.phase('update'):
+                        self.update()
+                    with INSTRUMENTS.phase('draw'):
+                        self.render()
+
+    def input(self, events=None):
         """Iterates through event list, listens for user key-presses.
-            User may through certain keys, quit, start, restart or interact with the game."""
-        for event in pg.event.get():
+            User may through certain keys, quit, start, restart or interact with the game.
+            Unless events are given, they are taken from the scheduler."""
+        if events is None:
+            events = self.scheduler.events()
+        for event in events:
 
             if event.type == QUIT:
                 self.quit()
@@ -90,64 +141,134 @@ class Game(object):
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     self.quit()
-                if event.key in MOVEKEYS.keys() and self.alive:
-                    if self.control_arrow:
-                        self.arrow_sprite.sprite.move(MOVEKEYS[event.key])
-                    else:
-                        self.moves += 1
-                        self.player_sprite.sprite.move(MOVEKEYS[event.key])
-                if event.key == K_SPACE:
-                    if self.arrows >= 1:
-                        self.moves += 1
-                        self.arrows -= 1
-                        self.control_arrow = True
-                        self.player_sprite.sprite.shoot()
+                self.act(event.key)
                 if self.playing is False and event.key == K_RETURN:
                     return True
                 if event.key == K_BACKSPACE:
                     self.playing = False
                     self.running = False
 
+    def act(self, key):
+        """Performs the game action of a key, if it has any: moves the player
+        or the arrow, or shoots. Actions during a game are recorded."""
+        if self.recorder and self.playing and (key in MOVEKEYS.keys() or key == K_SPACE):
+            self.recorder.action(key)
+        if key in MOVEKEYS.keys() and self.alive:
+            if self.control_arrow:
+                self.arrow_sprite.sprite.move(MOVEKEYS[key])
+            else:
+                self.moves += 1
+                self.player_sprite.sprite.move(MOVEKEYS[key])
+        if key == K_SPACE:
+            if self.arrows >= 1:
+                self.moves += 1
+                self.arrows -= 1
+                self.control_arrow = True
+                self.player_sprite.sprite.shoot()
+
     def update(self):
         """Adds lightning where the player moves, so that the tile is visible.
-        Updates the screen."""
-        self.floor_sprite.update(self.player_sprite.sprite.rect)
-        pg.display.flip()
-
-    def draw(self):
-        """Main draw function - Applies background to screen, then draws sprites/text messages
-         in the order they are requested on top of that. Some sprites/text messages are only
-         drawn on screen under certain conditions."""
-        self.screen.blit(self.background, (0, 0))
-        self.floor_sprite.draw(self.screen)
-
-        pg.draw.line(self.screen, LIGHTGREY, (GRIDWIDTH * TILESIZE, 0), (GRIDWIDTH * TILESIZE, GRIDWIDTH * TILESIZE), 3)
-        self.draw_text("Difficulty: " + str(self.difficulty), 22, PINK, WIDTH * 0.90, HEIGHT / 1.1)
-        self.draw_text("Arrows: " + str(self.arrows), 16, PINK, WIDTH * 0.7, HEIGHT / 1.085)
-        self.draw_text("Score: " + str(self.moves), 16, PINK, WIDTH * 0.705, HEIGHT / 1.13)
-
-        self.draw_text("Walking around the culverts, suddenly:", 15, PINK, WIDTH * 0.81, HEIGHT * 1 / 12 - 30)
+        A tile lit just now is drawn again. Nothing is lit when replaying headless."""
+        if self.headless:
+            return
+        lit = self.floor_sprite.sprite.update(self.player_sprite.sprite.rect)
+        if lit is not None:
+            self.renderer.invalidate(lit)
+
+    def show(self, rects=None):
+        """Updates the screen with what has been drawn, only the given rects if there are any.
+        Nothing is shown when replaying headless."""
+        if self.headless:
+            return
+        if rects is None:
+            pg.display.flip()
+        else:
+            pg.display.update(rects)
+
+    def scene(self):
+        """Describes the game screen - The background, then sprites/text messages in the
+         order they are drawn on top of that, as items of the renderer. Some sprites/text
+         messages are only on screen under certain conditions. Once the game is over,
+         the board is revealed, and drawn as one item."""
+        items = [Item(self.background.get_rect(), 'background', blit(self.background, (0, 0)))]
+        if not self.draw_all:
+            floor = self.floor_sprite.sprite
+            items.append(Item(floor.rect, ('floor', id(floor)), floor.draw))
+
+        items.append(Item(pg.Rect(GRIDWIDTH * TILESIZE - 2, 0, 5, GRIDWIDTH * TILESIZE + 2), 'line', lambda surface: pg.draw.line(
+            surface, LIGHTGREY, (GRIDWIDTH * TILESIZE, 0), (GRIDWIDTH * TILESIZE, GRIDWIDTH * TILESIZE), 3)))
+        items.append(self.text_item("Difficulty: " + str(self.difficulty), 22, PINK, WIDTH * 0.90, HEIGHT / 1.1))
+        items.append(self.number_item("Arrows: ", self.arrows, 16, PINK, WIDTH * 0.7, HEIGHT / 1.085))
+        items.append(self.number_item("Score: ", self.moves, 16, PINK, WIDTH * 0.705, HEIGHT / 1.13))
+
+        items.append(self.text_item("Walking around the culverts, suddenly:", 15, PINK, WIDTH * 0.81, HEIGHT * 1 / 12 - 30))
         if self.wumpus_near:
-            self.draw_text("- You smell Wumpus.", 14, PINK, WIDTH * 0.72, HEIGHT * 1 / 12)
+            items.append(self.text_item("- You smell Wumpus.", 14, PINK, WIDTH * 0.72, HEIGHT * 1 / 12))
         if self.bats_near:
-            self.draw_text("- You can hear bats flapping.", 14, PINK, WIDTH * 0.7595, HEIGHT * 1 / 12 + 30)
+            items.append(self.text_item("- You can hear bats flapping.", 14, PINK, WIDTH * 0.7595, HEIGHT * 1 / 12 + 30))
         if self.pit_near:
-            self.draw_text("- You feel a draft.", 14, PINK, WIDTH * 0.72, HEIGHT * 1 / 12 + 60)
+            items.append(self.text_item("- You feel a draft.", 14, PINK, WIDTH * 0.72, HEIGHT * 1 / 12 + 60))
 
         if self.draw_all:
-            self.floor_sprite.add(Floor(game, load_asset(IMAGE, TILE), LIGHT_FULL, GRIDWIDTH, GRIDHEIGHT))
-            self.floor_sprite.draw(self.screen)
-            self.wumpus_sprite.draw(self.screen)
-            self.bat_sprites.draw(self.screen)
-            self.pit_sprites.draw(self.screen)
+            items.append(self.revealed_item(self.board_items()))
+        else:
+            items.extend(self.board_items())
+        return items
+
+    def board_items(self):
+        """Describes what is on the board, on top of the floor: all entities once the game
+        is over, the bats that have been hit, the player and the arrow, and the reason
+        to why the game ended."""
+        items = []
+        if self.draw_all:
+            items.append(Item(self.revealed_floor.rect, 'revealed', self.revealed_floor.draw))
+            for group in (self.wumpus_sprite, self.bat_sprites, self.pit_sprites):
+                items.extend(self.sprite_item(sprite) for sprite in group)
 
         if len(self.bats_hit) > 0:
             for sprite in self.bat_sprites:
                 if sprite.num in self.bats_hit:
-                    sprite.draw()
+                    items.append(self.sprite_item(sprite))
+
+        items.extend(self.sprite_item(sprite) for sprite in self.player_sprite)
+        items.extend(self.sprite_item(sprite) for sprite in self.arrow_sprite)
+
+        if self.cause is not None:
+            items.extend(self.game_over_items(self.cause))
+        return items
+
+    def revealed_item(self, items):
+        """Returns the revealed board as one item. The board's items are drawn into a
+        surface of its own, which is kept and only drawn again when they change."""
+        state = tuple((tuple(item.rect), item.key) for item in items)
+        if state != self.revealed_state:
+            INSTRUMENTS.count('board_composites')
+            self.revealed.blit(self.background, (0, 0))
+            for item in items:
+                item.paint(self.revealed)
+            self.revealed_state = state
+        return Item(self.revealed.get_rect(), ('board', state), blit(self.revealed, (0, 0)))
+
+    def game_over_items(self, cause):
+        """Describes the reason to why the game ended, drawn on top of the revealed game."""
+        if not self.alive:
+            yield self.text_item("You died.", 48, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 5)
+            if cause == "Wumpus":
+                yield self.text_item("Wumpus got you", 13, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 4)
+            elif cause == "Pit":
+                yield self.text_item("You fell into a pit.", 13, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 4)
+        elif not self.wumpus_alive:
+            yield self.text_item("You Won!", 48, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 5)
+            yield self.text_item("You killed Wumpus!", 13, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 4)
+
+    def draw(self):
+        """Main draw function - Draws the whole game screen."""
+        for item in self.scene():
+            item.paint(self.screen)
 
-        self.player_sprite.draw(self.screen)
-        self.arrow_sprite.draw(self.screen)
+    def render(self):
+        """Draws the parts of the game screen that changed since the last frame, and shows them."""
+        self.show(self.renderer.render(self.scene()))
 
     def load_highscore(self):
         """Calls for highscore data"""
@@ -159,12 +280,13 @@ class Game(object):
         self.new_highscore = False
         if (self.highscore == 0 or self.moves < self.highscore) and self.wumpus_alive is False:
             self.highscore = self.moves
-            self.new_highscore = True
             self.save_highscore()
+            self.new_highscore = self.highscore == self.moves
 
     def save_highscore(self):
-        """Calls for saving data"""
-        save_data(FILE, HIGHSCORE, self.highscore)
+        """Calls for saving data. Another game may have saved a better score
+        since it was loaded, in which case that one is kept."""
+        self.highscore = save_data(FILE, HIGHSCORE, self.highscore, best_score)
 
     def change_difficulty(self, offset):
         """User calls for change in difficulty, checks that this is within allowed range
@@ -190,20 +312,16 @@ class Game(object):
         proceed to the Game Over screen."""
         self.draw_all = True
         self.playing = False
-        self.draw()
+        if self.recorder:
+            self.recorder.finish(self)
+        if self.headless:
+            return False
+        self.cause = cause
+        self.scheduler.mark()
 
         while True:
-            if not self.alive:
-                self.draw_text("You died.", 48, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 5)
-                if cause == "Wumpus":
-                    self.draw_text("Wumpus got you", 13, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 4)
-                elif cause == "Pit":
-                    self.draw_text("You fell into a pit.", 13, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 4)
-            elif not self.wumpus_alive:
-                self.draw_text("You Won!", 48, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 5)
-                self.draw_text("You killed Wumpus!", 13, PINK, WIDTH * 2 / 6, HEIGHT * 2 / 4)
-
-            self.update()
+            if self.scheduler.redraw():
+                self.render()
             if self.input():
                 return False
 
@@ -246,7 +364,7 @@ class Game(object):
             self.screen.blit(load_asset(IMAGE, BACKGROUND_GO_WON), (0, 0))
 
         self.screen.blit(load_asset(IMAGE, GAMEOVER), (WIDTH / 2 - 125, HEIGHT / 5))
-        self.draw_text("Score: " + str(self.moves), 22, PINK, WIDTH / 2, HEIGHT / 2)
+        self.draw_number("Score: ", self.moves, 22, PINK, WIDTH / 2, HEIGHT / 2)
         self.draw_text("Press Enter to play again", 22, WHITE, WIDTH / 2, HEIGHT * 3 / 4)
         self.draw_text("Difficulty: " + str(self.difficulty), 22, PINK, WIDTH * 0.90, HEIGHT / 1.1)
         self.draw_text("Arrow Up/Down - Change difficulty", 14, PINK, WIDTH / 2, HEIGHT / 2 + 99)
@@ -258,10 +376,11 @@ class Game(object):
 
     def wait_input(self, screen):
         """Iterates through events captured, much like input function, except that it
-         it will continue to loop until the user wants to proceed. """
+         it will continue to loop until the user wants to proceed. Sleeps until there
+         are events, and draws the screen again once they have been handled."""
         wait = True
         while wait:
-            for event in pg.event.get():
+            for event in self.scheduler.events():
 
                 if event.type == QUIT:
                     self.quit()
@@ -276,6 +395,7 @@ class Game(object):
                     if event.key == K_DOWN and (screen == "Start" or screen == "Game Over"):
                         self.change_difficulty(-1)
 
+            if wait and self.scheduler.redraw():
                 if screen == "Start":
                     self.draw_menu_screen()
                 if screen == "Game Over":
@@ -283,12 +403,43 @@ class Game(object):
 
     def draw_text(self, text, size, color, x, y):
         """General text-drawing function. Takes in what text to draw, and different
-        parameters that sets various attributes of the drawn message. Pushes to screen."""
-        font = pg.font.SysFont("monospace", size)
-        text_surface = font.render(text, True, color)
+        parameters that sets various attributes of the drawn message. Pushes to screen.
+        The text is rendered once, and then taken from the text cache."""
+        self.text_item(text, size, color, x, y).paint(self.screen)
+
+    def text_item(self, text, size, color, x, y):
+        """Returns a text message as an item of the renderer, see draw_text."""
+        text_surface = TEXT.render(text, size, color)
         text_rect = text_surface.get_rect()
         text_rect.midtop = (x, y)
-        self.screen.blit(text_surface, text_rect)
+        return Item(text_rect, ('text', text, size, color), blit(text_surface, text_rect))
+
+    def draw_number(self, label, number, size, color, x, y):
+        """Draws a label followed by a number, like draw_text. The label comes from
+        the text cache and the number from the digit strip, so a changed number
+        needs nothing to be rendered, unless the strip is not exact for the font."""
+        self.number_item(label, number, size, color, x, y).paint(self.screen)
+
+    def number_item(self, label, number, size, color, x, y):
+        """Returns a label followed by a number as an item of the renderer, see draw_number."""
+        digits = TEXT.digits(size, color)
+        if not digits.exact:
+            return self.text_item(label + str(number), size, color, x, y)
+        label_surface = TEXT.render(label, size, color)
+        text_rect = pg.Rect(0, 0, label_surface.get_width() + digits.width(number), label_surface.get_height())
+        text_rect.midtop = (x, y)
+
+        def paint(surface):
+            surface.blit(label_surface, text_rect)
+            digits.blit(surface, number, text_rect.x + label_surface.get_width(), text_rect.y)
+        return Item(text_rect, ('number', label, number, size, color), paint)
+
+    def sprite_item(self, sprite, key=None):
+        """Returns a sprite where it is as an item of the renderer. Unless a key is given,
+        the sprite's image is the key, so that a changed image is drawn again. The item
+        covers the image, which may be larger than the sprite's rect, as the floor's is."""
+        rect = sprite.image.get_rect(topleft=sprite.rect.topleft)
+        return Item(rect, key or id(sprite.image), blit(sprite.image, rect))
 
     @staticmethod
     def quit():
@@ -300,8 +451,26 @@ if __name__ == "__main__":
     """Main function. Creates a new game object, calls for the menu screen to show, for the game initiate
     and the game over screen to show. If the user does nto call for a quit, the game will restart,
      allowing the user to play again."""
-    game = Game()
-    game.show_menu_screen()
-    while True:
-        game.new()
-        game.show_game_over_screen()
+    parser = argparse.ArgumentParser(description="Wumpus.")
+    parser.add_argument('-s', '--seed', type=int, help="seed of the session, to play the same games again")
+    parser.add_argument('-r', '--record', help="corpus file to record the games to")
+    parser.add_argument('-i', '--instrument', help="file to export phase timings to, .json or .csv")
+    parser.add_argument('-p', '--profile', help="pstats file to write a cProfile of the session to")
+    parser.add_argument('-f', '--fps', type=int, default=FPS, help="frames per second at most")
+    parser.add_argument('-d', '--debug-dirty', action='store_true', help="outline the parts of the screen drawn")
+    args = parser.parse_args()
+    if args.instrument:
+        INSTRUMENTS.enable(args.instrument)
+
+    def session():
+        game = Game(args.seed, args.record, args.fps, args.debug_dirty)
+        game.show_menu_screen()
+        while True:
+            game.new()
+            game.show_game_over_screen()
+
+    if args.profile:
+        from instrument import profile
+        profile(session, args.profile)
+    else:
+        session()
@@ -1,4 +1,8 @@
 from settings import *
+from filelock import FileLock, atomic_write
+from instrument import INSTRUMENTS
+from assets import IMAGE_CACHE
+from occupancy import WUMPUS_CODE, BAT_CODE, PIT_CODE, NAMES
 
 
 class MissingAsset:
@@ -10,54 +14,68 @@ class MissingAsset:
 
 class BaseTile(pg.sprite.Sprite):
     """The Base class of a tile. All other classes inherit attributes from this.
-    What parameters to have and what attributes to initialize."""
+    What parameters to have and what attributes to initialize.
+    Images are shared between sprites, so one with another alpha gets a copy of its own."""
     def __init__(self, game, image, alpha, x, y):
         pg.sprite.Sprite.__init__(self)
         self.rect = image.get_rect()
         self.rect.left, self.rect.top = x, y
         self.width, self.height = image.get_width(), image.get_height()
-        self.texture = image
-        self.texture.set_alpha(alpha)
+        self.texture = IMAGE_CACHE.with_alpha(image, alpha)
         self.size = TILESIZE
         self.image = self.texture
 
 
 class Floor(BaseTile):
-    """Floor class. Defines the floor. Inherits from 'Tile' class."""
+    """Floor class. Defines the floor. Inherits from 'Tile' class.
+    Which tiles have been lit is kept as one bit per tile. The floor is drawn from
+    two tile surfaces, made once: the tile in the floor's light, and the tile lit.
+    Tiles that would not show unlit are not drawn."""
     def __init__(self, game, image, alpha, width, height):
         super(Floor, self).__init__(game, image, alpha, 0, 0)
-        self.width, self.height = width*TILESIZE, height*TILESIZE
-        image = pg.Surface((self.width, self.height), pg.SRCALPHA)
+        self.columns, self.rows = int(width), int(height)
+        self.width, self.height = self.columns*TILESIZE, self.rows*TILESIZE
+        self.rect = pg.Rect(0, 0, self.width, self.height)
+        self.visible = bytearray((self.columns*self.rows + 7) // 8)
+        self.unlit, self.lit = IMAGE_CACHE.lighting(self.texture)
 
-        for row in range(int(GRIDWIDTH)):
-            for col in range(int(GRIDWIDTH)):
-                image.blit(self.image, (row*TILESIZE, col*TILESIZE))
-        self.image = image
+    def is_lit(self, column, row):
+        """Checks if the tile in the given column and row has been lit."""
+        tile = row*self.columns + column
+        return bool(self.visible[tile >> 3] & (1 << (tile & 7)))
 
     def update(self, rect):
-        """Updates light. If the user moves, the tile is lit up."""
-        r = self.size
-        x, y = rect.x, rect.y
-        s_array = pg.surfarray.pixels_alpha(self.image)
-        s_array[x:x+r, y:y+r] = 255
+        """Updates light. If the user moves, the tile is lit up.
+        Returns the rect of the tile if it was lit just now, otherwise None."""
+        column, row = rect.x // TILESIZE, rect.y // TILESIZE
+        tile = row*self.columns + column
+        if self.visible[tile >> 3] & (1 << (tile & 7)):
+            return None
+        self.visible[tile >> 3] |= 1 << (tile & 7)
+        return pg.Rect(column*TILESIZE, row*TILESIZE, TILESIZE, TILESIZE)
+
+    def draw(self, surface):
+        """Draws the tiles of the floor that are inside the surface's clip."""
+        area = surface.get_clip().clip(self.rect)
+        for row in range(area.top // TILESIZE, (area.bottom + TILESIZE - 1) // TILESIZE):
+            for column in range(area.left // TILESIZE, (area.right + TILESIZE - 1) // TILESIZE):
+                tile = self.lit if self.is_lit(column, row) else self.unlit
+                if tile is not None:
+                    surface.blit(tile, (column*TILESIZE, row*TILESIZE))
 
 
 class Player(BaseTile):
     """User Class. Defines the player. Inherits from 'Tile' class."""
     def __init__(self, game, image, alpha):
-        super(Player, self).__init__(game, image, alpha, random_pos('WIDTH'), random_pos('HEIGHT'))
+        super(Player, self).__init__(game, image, alpha, 0, 0)
         self.game = game
         self.place_player()
         self.print_dangers()
 
     def place_player(self):
-        """Calls for a random values to assign to player position. If these values
-        will cause the player to collide with another sprite, a new set of coordinates
-        are called for."""
-        self.rect.x, self.rect.y = random_pos('WIDTH'), random_pos('HEIGHT')
-
-        while check_collide(self, self.game)[0]:
-            self.rect.x, self.rect.y = random_pos('WIDTH'), random_pos('HEIGHT')
+        """Calls for a random free tile to assign to player position. The tile
+        is not taken, since the player will move on from it."""
+        self.rect.x, self.rect.y = tile_pos(self.game.tiles.choose())
 
     def move(self, direction):
         """Handles movement of player. Calls for check of where the user wants to move,
@@ -107,31 +125,14 @@ class Player(BaseTile):
                 self.game.bats_hit.append(sprite.num)
 
     def print_dangers(self):
-        """The player has spawned or moved. Checks for any sprites in adjacent tiles (8-directions).
-        Applies changes to a bool in case anything was near."""
-        r = TILESIZE
-        x, y, = self.rect.x, self.rect.y
-        w_x, w_y = self.game.wumpus_sprite.sprite.rect.x, self.game.wumpus_sprite.sprite.rect.y
-        adjacent = {(x+r, y), (x-r, y), (x, y+r), (x, y-r), (x+r, y+r), (x+r, y-r), (x-r, y+r), (x-r, y-r)}
-
-        if (w_x, w_y) in adjacent:
-            self.game.wumpus_near = True
-        else:
-            self.game.wumpus_near = False
-
-        for sprite in self.game.bat_sprites:
-            if (sprite.rect.x, sprite.rect.y) in adjacent:
-                self.game.bats_near = True
-                break
-            else:
-                self.game.bats_near = False
-
-        for sprite in self.game.pit_sprites:
-            if (sprite.rect.x, sprite.rect.y) in adjacent:
-                self.game.pit_near = True
-                break
-            else:
-                self.game.pit_near = False
+        """The player has spawned or moved. Checks for any entities in adjacent tiles (8-directions).
+        Applies changes to a bool in case anything was near. What is near every tile is
+        kept by the occupancy grid."""
+        occupancy = self.game.occupancy
+        tile = occupancy.tile(self.rect)
+        self.game.wumpus_near = occupancy.is_near(tile, WUMPUS_CODE)
+        self.game.bats_near = occupancy.is_near(tile, BAT_CODE)
+        self.game.pit_near = occupancy.is_near(tile, PIT_CODE)
 
 
 class Arrow(BaseTile):
@@ -191,16 +192,16 @@ class Arrow(BaseTile):
 class Wumpus(BaseTile):
     """Wumpus Class. Defines the Wumpus. Inherits from 'Tile' class."""
     def __init__(self, game, image, alpha, x, y):
-        super(Wumpus, self).__init__(game, image, alpha, random_pos('WIDTH'), random_pos('HEIGHT'))
+        super(Wumpus, self).__init__(game, image, alpha, 0, 0)
         self.game = game
         self.visible = False
         self.place()
 
     def place(self):
-        """Places Wumpus in an empty tile. Passes itself and game instance
-        to the collide function."""
-        while check_collide(self, self.game)[0]:
-            self.rect.x, self.rect.y = random_pos('WIDTH'), random_pos('HEIGHT')
+        """Places Wumpus in an empty tile, taken from the game's free tiles."""
+        tile = self.game.tiles.take()
+        self.rect.x, self.rect.y = tile_pos(tile)
+        self.game.occupancy.place(tile, WUMPUS_CODE)
 
     def draw(self):
         """Draws Wumpus."""
@@ -210,16 +211,16 @@ class Wumpus(BaseTile):
 class Bat(BaseTile):
     """Bat Class. Defines the Bat. Inherits from 'Tile' class."""
     def __init__(self, game, image, alpha, x, y, num):
-        super(Bat, self).__init__(game, image, alpha, random_pos('WIDTH'), random_pos('HEIGHT'))
+        super(Bat, self).__init__(game, image, alpha, 0, 0)
         self.game = game
         self.num = num
         self.place()
 
     def place(self):
-        """Places Bat in an empty tile. Passes itself and game instance
-        to the collide function."""
-        while check_collide(self, self.game)[0]:
-            self.rect.x, self.rect.y = random_pos('WIDTH'), random_pos('HEIGHT')
+        """Places Bat in an empty tile, taken from the game's free tiles."""
+        tile = self.game.tiles.take()
+        self.rect.x, self.rect.y = tile_pos(tile)
+        self.game.occupancy.place(tile, BAT_CODE)
 
     def draw(self):
         """Draws pit onto the screen."""
@@ -229,50 +230,47 @@ class Bat(BaseTile):
 class Pit(BaseTile):
     """Pit Class. Defines the Pit. Inherits from 'Tile' class."""
     def __init__(self, game, image, alpha, x, y, num):
-        super(Pit, self).__init__(game, image, alpha, random_pos('WIDTH'), random_pos('HEIGHT'))
+        super(Pit, self).__init__(game, image, alpha, 0, 0)
         self.game = game
         self.num = num
         self.place()
 
     def place(self):
-        """Places Pit in an empty tile. Passes itself and game instance
-        to the collide function."""
-        while check_collide(self, self.game)[0]:
-            self.rect.x, self.rect.y = random_pos('WIDTH'), random_pos('HEIGHT')
+        """Places Pit in an empty tile, taken from the game's free tiles."""
+        tile = self.game.tiles.take()
+        self.rect.x, self.rect.y = tile_pos(tile)
+        self.game.occupancy.place(tile, PIT_CODE)
 
     def draw(self):
         """Draws pit onto the screen."""
         self.game.screen.blit(self.image, self.rect)
 
 
-def random_pos(pos):
-    """General function that generates a random integers which lies
-    within given boundaries of the game-plan."""
-    if pos == 'WIDTH':
-        return randint(0, GRIDWIDTH - 1) * TILESIZE
-    elif pos == 'HEIGHT':
-        return randint(0, GRIDHEIGHT - 1) * TILESIZE
+def tile_pos(tile):
+    """General function that converts the number of a tile
+    to its position on the game-plan."""
+    return (tile % int(GRIDWIDTH)) * TILESIZE, (tile // int(GRIDWIDTH)) * TILESIZE
 
 
 def check_collide(instance, entities):
     """General collision function. Checks whether the instance (e.g. Player/Arrow/Bat...)
-    has collided with any other sprite/entity. Returns if there was a collision and with what."""
-    collision, entity = False, "None"
-    if len(pg.sprite.spritecollide(instance, entities.bat_sprites, False)) > 0:
-        collision, entity = True, "Bat"
-    elif len(pg.sprite.spritecollide(instance, entities.wumpus_sprite, False)) > 0:
-        collision, entity = True, "Wumpus"
-    elif len(pg.sprite.spritecollide(instance, entities.pit_sprites, False)) > 0:
-        collision, entity = True, "Pit"
-    return collision, entity
+    has collided with any other sprite/entity. Returns if there was a collision and with what.
+    The entity in the instance's tile is looked up in the occupancy grid."""
+    occupancy = entities.occupancy
+    code = occupancy.at(occupancy.tile(instance.rect))
+    if code in NAMES:
+        return True, NAMES[code]
+    return False, "None"
 
 
 def load_asset(asset, file):
     """Loads assets from root folder. Receives info on what kind of file
-    and what asset that is requested. If it fails to find/load an exceptions is thrown."""
+    and what asset that is requested. If it fails to find/load an exceptions is thrown.
+    Images come from the asset manager, loaded once. Requests are counted when instrumented."""
+    INSTRUMENTS.count('asset_loads')
     if asset == IMAGE:
         try:
-            image = pg.image.load(os.path.join(asset, file))
+            image = IMAGE_CACHE.image(file)
         except pg.error as message:
             print("Missing asset: " + file + " from " + asset)
             raise SystemExit(message)
@@ -290,8 +288,22 @@ def load_asset(asset, file):
         return data
 
 
-def save_data(asset, file, data):
-    """Saves data. Receives input of what kind of file, and what file."""
+def save_data(asset, file, data, merge=None):
+    """Saves data. Receives input of what kind of file, and what file.
+    Other games may save at the same time, so the file is locked while saving and
+    replaced whole. If a merge function is given, it receives the data already
+    saved and the new data, and returns what to save. Returns the saved data."""
     if asset == FILE:
-        with open(os.path.join(asset, file), 'w+') as file:
-            file.write(str(data))
+        path = os.path.join(asset, file)
+        with FileLock(path + ".lock"):
+            if merge is not None:
+                data = merge(load_asset(asset, file), data)
+            atomic_write(path, [str(data)])
+        return data
+
+
+def best_score(saved, score):
+    """Merge function for highscores, keeps the lowest number of moves."""
+    if saved == 0:
+        return score
+    return min(saved, score)
@@ -0,0 +1,45 @@
+"""Occupancy grid of the board. It is where the game looks up what is in a tile:
+every tile holds the code of the entity in it, and for every kind of entity,
+how many of them are next to the tile, in any of the 8 directions. These counts
+are kept up to date when an entity is placed, and entities stay where they are
+placed, so finding out what the player walked into, or what is near, is a lookup,
+no matter how many entities or tiles there are. Tiles are numbered row by row, as by the allocator."""
+
+from settings import TILESIZE
+
+EMPTY, WUMPUS_CODE, BAT_CODE, PIT_CODE = 0, 1, 2, 3
+NAMES = {WUMPUS_CODE: "Wumpus", BAT_CODE: "Bat", PIT_CODE: "Pit"}
+DIRECTIONS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+class Occupancy:
+    """The entity in every tile, and the entities next to it, counted by kind."""
+    def __init__(self, columns, rows):
+        self.columns, self.rows = columns, rows
+        self.cells = bytearray(columns * rows)
+        self.near = {code: bytearray(columns * rows) for code in NAMES}
+
+    def tile(self, rect):
+        """Returns the number of the tile at the rect's position."""
+        return (rect.y // TILESIZE) * self.columns + rect.x // TILESIZE
+
+    def neighbours(self, tile):
+        """Returns the tiles next to the given one, on the board."""
+        row, column = divmod(tile, self.columns)
+        return [(row + dy) * self.columns + column + dx for dx, dy in DIRECTIONS
+                if 0 <= column + dx < self.columns and 0 <= row + dy < self.rows]
+
+    def at(self, tile):
+        """Returns the code of the entity in the tile, EMPTY if there is none."""
+        return self.cells[tile]
+
+    def is_near(self, tile, code):
+        """Checks if any entity of the given kind is next to the tile."""
+        return self.near[code][tile] > 0
+
+    def place(self, tile, code):
+        """Puts an entity in an empty tile."""
+        self.cells[tile] = code
+        near = self.near[code]
+        for neighbour in self.neighbours(tile):
+            near[neighbour] += 1
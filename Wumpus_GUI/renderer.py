@@ -0,0 +1,94 @@
+"""Retained-mode rendering of the GUI. Every frame, the game describes what is
+on the screen as a list of items, bottom to top: the rect an item covers, a key
+that changes whenever the item looks different, and a function drawing it onto
+a given surface.
+The renderer compares the items with those of the frame before, and only the
+rects of items that appeared, moved, changed or went away are drawn again, with
+every item overlapping them drawn in order and clipped to them. Only those rects
+are then pushed to the display. What changes without its item changing, like
+a tile being lit, is drawn again when its rect is invalidated.
+
+With debug on, the redrawn rects are outlined, so it can be seen what is drawn."""
+
+from collections import namedtuple
+
+from settings import pg, GREEN
+from instrument import INSTRUMENTS
+
+DEBUG_COLOR = GREEN
+
+Item = namedtuple('Item', 'rect key paint')
+
+
+def merge(rects):
+    """Returns the rects with every group of overlapping ones replaced by their union."""
+    merged = []
+    for rect in rects:
+        rect = pg.Rect(rect)
+        i = 0
+        while i < len(merged):
+            if rect.colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+def blit(image, position, area=None):
+    """Returns a function drawing the image at the position onto a surface."""
+    return lambda surface: surface.blit(image, position, area)
+
+
+class Renderer:
+    """Draws the parts of the screen that changed since the last frame."""
+    def __init__(self, screen, debug=False):
+        self.screen = screen
+        self.debug = debug
+        self.shown = None
+        self.outlined = []
+        self.invalid = []
+
+    def invalidate(self, rect=None):
+        """Draws the given rect again in the next frame. Without a rect, forgets what
+        is on the screen, e.g. after another screen has been drawn over it, so that
+        the next frame is drawn whole."""
+        if rect is None:
+            self.shown = None
+            self.invalid = []
+        elif self.shown is not None:
+            self.invalid.append(pg.Rect(rect))
+
+    def dirty(self, items):
+        """Returns the rects that have to be drawn again to show the items,
+        and remembers the items as shown."""
+        current = set((tuple(item.rect), item.key) for item in items)
+        if self.shown is None:
+            rects = [self.screen.get_rect()]
+        else:
+            rects = [rect for rect, key in self.shown ^ current] + self.outlined + self.invalid
+        self.shown = current
+        self.invalid = []
+
+        bounds = self.screen.get_rect()
+        return [rect for rect in (rect.clip(bounds) for rect in merge(rects)) if rect.width and rect.height]
+
+    def render(self, items):
+        """Draws what changed and returns the rects to push to the display."""
+        rects = self.dirty(items)
+        for rect in rects:
+            self.screen.set_clip(rect)
+            for item in items:
+                if rect.colliderect(item.rect):
+                    item.paint(self.screen)
+        self.screen.set_clip(None)
+
+        self.outlined = []
+        if self.debug:
+            for rect in rects:
+                pg.draw.rect(self.screen, DEBUG_COLOR, rect, 1)
+            self.outlined = list(rects)
+        INSTRUMENTS.count('dirty_rects', len(rects))
+        INSTRUMENTS.count('dirty_pixels', sum(rect.width * rect.height for rect in rects))
+        return rects
@@ -0,0 +1,183 @@
+"""Game recordings. A game is recorded as its seed and difficulty followed by
+the keys the player pressed, one byte each, so a game can be played again
+exactly as it was. Recordings are appended to a corpus file, and replayed one
+at a time straight from disk, headless and without waiting for input, so that
+a corpus of any size can be rerun as a regression and performance test.
+
+A corpus file starts with MAGIC, followed by the games. Every game is stored
+as its length, as an unsigned LEB128 varint, then the seed, the difficulty and
+the moves taken times two plus one if the game was won, as varints, and the
+keys, each as its position in KEYS."""
+
+import argparse
+import os
+import time
+from collections import namedtuple
+
+from settings import pg, MOVEKEYS, K_SPACE
+
+MAGIC = b'WRG1'
+KEYS = tuple(MOVEKEYS) + (K_SPACE,)
+ACTIONS = {key: i for i, key in enumerate(KEYS)}
+
+Recording = namedtuple('Recording', 'seed difficulty won moves keys')
+Recording.__doc__ = """A recorded game. The outcome is what it was when it was recorded."""
+
+
+class BadRecording(Exception):
+    """Raised when a file is not a corpus or a recording is cut off."""
+
+
+def write_varint(buffer, value):
+    """Appends an unsigned integer to the buffer, seven bits per byte."""
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position):
+    """Reads an unsigned integer from data at the given position.
+    Returns the integer and the position after it."""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def decode(data):
+    """Returns the recording stored in the given bytes."""
+    seed, position = read_varint(data, 0)
+    difficulty, position = read_varint(data, position)
+    outcome, position = read_varint(data, position)
+    keys = [KEYS[i] for i in data[position:]]
+    return Recording(seed, difficulty, bool(outcome & 1), outcome >> 1, keys)
+
+
+class Recorder:
+    """Records games to a corpus file, appending to it if it exists.
+    A game is only written once it has ended, in a single write."""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.seed = self.difficulty = None
+        self.keys = bytearray()
+
+    def start(self, game):
+        """Starts recording a new game."""
+        self.seed, self.difficulty = game.seed, game.difficulty
+        self.keys = bytearray()
+
+    def action(self, key):
+        """Records a key the player pressed."""
+        self.keys.append(ACTIONS[key])
+
+    def finish(self, game):
+        """The game has ended. Writes it to the corpus with its outcome.
+        Does nothing if no game has been started."""
+        if self.seed is None:
+            return
+        body = bytearray()
+        write_varint(body, self.seed)
+        write_varint(body, self.difficulty)
+        write_varint(body, game.moves << 1 | (not game.wumpus_alive))
+        body += self.keys
+
+        record = bytearray()
+        write_varint(record, len(body))
+        self.file.write(record + body)
+        self.file.flush()
+        self.seed = None
+
+    def close(self):
+        """Closes the corpus file."""
+        self.file.close()
+
+
+def read(path):
+    """Iterates over the recordings of a corpus file, reading one at a time."""
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise BadRecording("Not a recording corpus: " + path)
+        while True:
+            length = shift = 0
+            while True:
+                byte = file.read(1)
+                if not byte:
+                    if shift:
+                        raise BadRecording("Recording cut off in " + path)
+                    return
+                length |= (byte[0] & 0x7F) << shift
+                shift += 7
+                if byte[0] < 0x80:
+                    break
+            data = file.read(length)
+            if len(data) != length:
+                raise BadRecording("Recording cut off in " + path)
+            yield decode(data)
+
+
+def play(game, recording):
+    """Plays a recording again on the given game, headless. Returns the game."""
+    game.headless = True
+    game.difficulty = recording.difficulty
+    game.initialize_values(recording.seed)
+    game.difficulty_modifier()
+    game.initialize_sprites()
+    for key in recording.keys:
+        if not game.playing:
+            break
+        game.act(key)
+    return game
+
+
+def headless():
+    """Switches the display to SDL's dummy driver, so no window is opened,
+    unless a video driver has been chosen in the environment."""
+    if 'SDL_VIDEODRIVER' not in os.environ:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pg.display.quit()
+        pg.display.init()
+
+
+def verify(path, limit=10):
+    """Replays every game in a corpus and compares the outcomes with the recorded
+    ones. Returns the number of games and keys, the time taken and the first
+    games, by number, that did not end the same way."""
+    headless()
+    from main import Game
+    game = Game()
+    games = keys = 0
+    mismatches = []
+    start = time.perf_counter()
+    for number, recording in enumerate(read(path)):
+        play(game, recording)
+        games += 1
+        keys += len(recording.keys)
+        if (not game.wumpus_alive, game.moves) != (recording.won, recording.moves) and len(mismatches) < limit:
+            mismatches.append(number)
+    return games, keys, time.perf_counter() - start, mismatches
+
+
+def main():
+    """Reads the arguments and replays the corpus."""
+    parser = argparse.ArgumentParser(description="Replays recorded games and checks their outcomes.")
+    parser.add_argument('corpus', help="corpus file")
+    args = parser.parse_args()
+
+    games, keys, seconds, mismatches = verify(args.corpus)
+    print("Replayed {0} games, {1} keys in {2:.2f} s ({3:.0f} games per second).".format(
+        games, keys, seconds, games / seconds if seconds else 0.0))
+    for number in mismatches:
+        print("Game {0} did not end as recorded.".format(number))
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
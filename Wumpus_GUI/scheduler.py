@@ -0,0 +1,81 @@
+"""Frame scheduler of the GUI. The screen is only drawn again when something
+has changed, at most FPS times a second. While nothing has changed, the game
+sleeps until the player does something, or until IDLE_TIMEOUT has passed,
+instead of spinning through the loop, so an idle game uses next to no CPU.
+How much it does use, while idle, is measured."""
+
+import time
+
+from settings import pg, FPS, IDLE_TIMEOUT
+from instrument import INSTRUMENTS
+
+IGNORED = (pg.MOUSEMOTION,)
+
+
+class Scheduler:
+    """Decides when to wait for events and when to draw a frame."""
+    def __init__(self, fps=FPS, idle_timeout=IDLE_TIMEOUT):
+        """A frame rate of 0 draws frames as fast as they are asked for.
+        The idle timeout is in milliseconds."""
+        self.clock = pg.time.Clock()
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.dirty = True
+
+        self.frames = 0
+        self.idle_wall = 0.0
+        self.idle_cpu = 0.0
+
+    def mark(self):
+        """Something has changed, the screen has to be drawn again."""
+        self.dirty = True
+
+    def events(self):
+        """Returns the events that have happened. If the screen is up to date,
+        waits for the first one, at most the idle timeout. Any event but mouse
+        motion marks the screen as changed."""
+        if self.dirty:
+            self.clock.tick(self.fps)
+            events = pg.event.get()
+        else:
+            events = self.wait()
+        if any(event.type not in IGNORED for event in events):
+            self.dirty = True
+        return events
+
+    def wait(self):
+        """Sleeps until an event arrives or the idle timeout has passed.
+        Returns the events, and counts the time and CPU time spent."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            event = pg.event.wait(self.idle_timeout)
+        except TypeError:
+            # Pygame before 2.0 waits without a timeout.
+            event = pg.event.wait()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        self.idle_wall += wall
+        self.idle_cpu += cpu
+        INSTRUMENTS.count('idle_ms', wall * 1000)
+        INSTRUMENTS.count('idle_cpu_ms', cpu * 1000)
+
+        if event.type == pg.NOEVENT:
+            return []
+        return [event] + pg.event.get()
+
+    def redraw(self):
+        """Returns True if a frame should be drawn now, and counts it."""
+        if not self.dirty:
+            return False
+        self.dirty = False
+        self.frames += 1
+        INSTRUMENTS.count('frames')
+        return True
+
+    def report(self):
+        """Returns the frames drawn, the seconds spent idle and the share
+        of one CPU used while idle, in percent."""
+        return {
+            'frames': self.frames,
+            'idle_seconds': round(self.idle_wall, 3),
+            'idle_cpu_percent': round(100.0 * self.idle_cpu / self.idle_wall, 2) if self.idle_wall else 0.0,
+        }
@@ -8,7 +8,7 @@ import pygame as pg
 from pygame.locals import QUIT, KEYDOWN, K_ESCAPE, K_RETURN, K_UP, K_DOWN, K_BACKSPACE, K_SPACE
 import sys
 import os
-from random import randint, choice
+import random
 
 pg.init()
 
@@ -17,6 +17,11 @@ DIFFICULTY = 2
 ARROWS = 5
 BATS = 3
 PITS = 4
+SEED_BITS = 64
+
+# Frames per second at most, and milliseconds to sleep while idle
+FPS = 60
+IDLE_TIMEOUT = 1000
 
 # Keys
 MOVEKEYS = {
@@ -62,7 +67,7 @@ MAIN = os.path.dirname(os.path.relpath(__file__))
 ASSETS = os.path.join(MAIN, "assets/")
 FILE = ASSETS
 IMAGE = os.path.join(ASSETS, "images/")
-HIGHSCORE = "Highscore.txt"
+HIGHSCORE = "highscore.txt"
 WUMPUS = "WUMPUS_GLOW.png"
 WUMPUSDEAD = "WUMPUSDEAD_GLOW.png"
 PLAYER = "Player.png"
@@ -78,5 +83,7 @@ ARROW_RIGHT = "Arrow-Right.png"
 ARROW_UP = "Arrow-Up.png"
 ARROW_LEFT = "Arrow-Left.png"
 ARROW_DOWN = "Arrow-Down.png"
+IMAGES = (WUMPUS, WUMPUSDEAD, PLAYER, PIT, BAT, TILE, BACKGROUND, BACKGROUND_GO_LOST, BACKGROUND_GO_WON,
+          WELCOME, GAMEOVER, ARROW_RIGHT, ARROW_UP, ARROW_LEFT, ARROW_DOWN)
 
 
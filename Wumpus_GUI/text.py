@@ -0,0 +1,129 @@
+"""Text rendering. Fonts are created once for each face and size, as looking
+up a system font may scan all fonts on the machine. Rendered texts are kept
+in a cache, least recently used first out, up to a memory limit in bytes, as
+most texts on the screen are the same from frame to frame.
+
+Numbers that change all the time, like the score, are not rendered at all,
+but put together from a strip of digits rendered once for each font and color.
+That only looks the same as rendering them when every character of the font is
+as wide as the others, so with any other font, e.g. the default font pygame
+falls back to, numbers are rendered with their label like any other text."""
+
+from collections import OrderedDict
+
+from settings import pg
+from instrument import INSTRUMENTS
+
+FACE = "monospace"
+DIGITS = "0123456789"
+PROBE = "11" + DIGITS + "00"
+LIMIT = 2 * 1024 * 1024
+
+
+def surface_bytes(surface):
+    """Returns the bytes of pixel data a surface holds."""
+    return surface.get_pitch() * surface.get_height()
+
+
+class Fonts:
+    """Registry of fonts, by face and size."""
+    def __init__(self):
+        self.fonts = {}
+
+    def get(self, size, face=FACE):
+        """Returns the font, creating it on first use."""
+        font = self.fonts.get((face, size))
+        if font is None:
+            font = self.fonts[face, size] = pg.font.SysFont(face, size)
+            INSTRUMENTS.count('font_creations')
+        return font
+
+
+class DigitStrip:
+    """The digits of a font in one color, each rendered once. A number is drawn
+    by blitting its digits one after the other, each moved on by its advance.
+    Exact tells if that looks the same as rendering the number."""
+    def __init__(self, font, color, antialias=True):
+        rendered = [font.render(digit, antialias, color) for digit in DIGITS]
+        self.strip = pg.Surface((sum(glyph.get_width() for glyph in rendered),
+                                 max(glyph.get_height() for glyph in rendered)), pg.SRCALPHA)
+        INSTRUMENTS.count('surface_allocations')
+        self.glyphs = {}
+        self.advances = {}
+        x = 0
+        for digit, glyph in zip(DIGITS, rendered):
+            self.strip.blit(glyph, (x, 0))
+            self.glyphs[digit] = self.strip.subsurface((x, 0, glyph.get_width(), glyph.get_height()))
+            self.advances[digit] = font.metrics(digit)[0][4]
+            x += glyph.get_width()
+        self.exact = self.check(font, color, antialias)
+
+    def check(self, font, color, antialias):
+        """Checks that the font is monospaced, and that numbers drawn from the strip
+        look the same as the font renders them."""
+        if len(set(font.size(character * 8)[0] for character in "iW " + DIGITS)) != 1:
+            return False
+        rendered = font.render(PROBE, antialias, color)
+        composed = pg.Surface(rendered.get_size(), pg.SRCALPHA)
+        self.blit(composed, PROBE, 0, 0)
+        return self.width(PROBE) == rendered.get_width() and \
+            pg.image.tostring(composed, 'RGBA') == pg.image.tostring(rendered, 'RGBA')
+
+    def width(self, number):
+        """Returns the width of the number in pixels."""
+        return sum(self.advances[digit] for digit in str(number))
+
+    def blit(self, target, number, x, y):
+        """Draws the number onto the target with its top left corner at x, y."""
+        for digit in str(number):
+            target.blit(self.glyphs[digit], (x, y))
+            x += self.advances[digit]
+
+
+class TextCache:
+    """Rendered texts, by text, size, color and antialiasing, and digit strips.
+    The least recently used texts are dropped once they hold more than limit bytes."""
+    def __init__(self, fonts=None, limit=LIMIT):
+        self.fonts = fonts if fonts is not None else Fonts()
+        self.limit = limit
+        self.texts = OrderedDict()
+        self.strips = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, size, color, antialias=True):
+        """Returns the rendered text, rendering it if it is not in the cache."""
+        key = text, size, tuple(color), antialias
+        surface = self.texts.get(key)
+        if surface is not None:
+            self.texts.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.fonts.get(size).render(text, antialias, color)
+        INSTRUMENTS.count('surface_allocations')
+        self.texts[key] = surface
+        self.bytes += surface_bytes(surface)
+        while self.bytes > self.limit and len(self.texts) > 1:
+            _, dropped = self.texts.popitem(last=False)
+            self.bytes -= surface_bytes(dropped)
+        return surface
+
+    def digits(self, size, color, antialias=True):
+        """Returns the digit strip of the font of the given size in the given color."""
+        key = size, tuple(color), antialias
+        strip = self.strips.get(key)
+        if strip is None:
+            strip = self.strips[key] = DigitStrip(self.fonts.get(size), color, antialias)
+        return strip
+
+    def clear(self):
+        """Drops all rendered texts and digit strips."""
+        self.texts.clear()
+        self.strips.clear()
+        self.bytes = 0
+
+
+TEXT = TextCache()
@@ -0,0 +1,99 @@
+"""Benchmarks of the CLI game. Boards are built from fixed seeds, and the
+score store lives in a temporary folder, so the real scores are untouched."""
+
+import atexit
+import random
+import tempfile
+from functools import partial
+
+from harness import Suite, use_game
+
+use_game("Wumpus_CLI")
+
+from objects import CSC, HighScore
+from engine import Engine
+from analyze import random_policy, LIMIT
+from scores import ScoreStore
+
+SEED = 154
+SCORES = 200
+
+suite = Suite("cli")
+
+
+def score_store():
+    """Returns a score store in a temporary folder, holding SCORES seeded scores."""
+    folder = tempfile.TemporaryDirectory()
+    atexit.register(folder.cleanup)
+    store = ScoreStore(folder.name)
+    rng = random.Random(SEED)
+    for i in range(SCORES):
+        store.add("player" + str(i), rng.randint(5, 200))
+    store.compact()
+    return store
+
+
+@suite.add("csc")
+def csc():
+    """Builds a new CSC, placing all dangers."""
+    seeds = random.Random(SEED)
+    return lambda: CSC(3, seed=seeds.getrandbits(64))
+
+
+@suite.add("check_move")
+def check_move():
+    """Checks the player's culvert for dangers, where there are none."""
+    return CSC(3, seed=SEED).check_move
+
+
+@suite.add("move_wumpus")
+def move_wumpus():
+    """Lets Wumpus wander on the hardest difficulty, where it moves every turn."""
+    return CSC(5, seed=SEED).move_wumpus
+
+
+@suite.add("culvert_str")
+def culvert_str():
+    """Describes the player's culvert, as shown every turn."""
+    return partial(str, CSC(3, seed=SEED).player_pos)
+
+
+@suite.add("highscore.load")
+def highscore_load():
+    """Reads the top scores from the store."""
+    return HighScore(score_store()).load_highscore
+
+
+@suite.add("highscore.sort")
+def highscore_sort():
+    """Sorts the loaded top scores."""
+    highscore = HighScore(score_store())
+    highscore.load_highscore()
+    return highscore.sort
+
+
+@suite.add("highscore.save")
+def highscore_save():
+    """Adds a score and merges it into the index."""
+    highscore = HighScore(score_store())
+    rng = random.Random(SEED)
+
+    def save():
+        highscore.store.add("player", rng.randint(5, 200))
+        highscore.save()
+    return save
+
+
+@suite.add("game", kind='macro')
+def game():
+    """Plays whole games with the random policy of the difficulty analyzer."""
+    seeds = random.Random(SEED)
+    policy = partial(random_policy, rng=random.Random(SEED))
+
+    def play():
+        Engine(CSC(3, seed=seeds.getrandbits(64))).play(policy, LIMIT)
+    return play
+
+
+if __name__ == "__main__":
+    suite.main()
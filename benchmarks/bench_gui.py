@@ -0,0 +1,132 @@
+"""Benchmarks of the GUI game. They run headless on SDL's dummy video driver.
+The game is set up from fixed seeds, and its highscore is only read."""
+
+import os
+import random
+from functools import partial
+
+from harness import Suite, use_game
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+use_game("Wumpus_GUI")
+
+from main import Game
+from objects import Floor, check_collide, load_asset
+from settings import IMAGE, TILE, LIGHT_NULL, GRIDWIDTH, GRIDHEIGHT, SEED_BITS, TILESIZE
+from replay import Recording, KEYS, play
+
+SEED = 154
+KEYS_PER_GAME = 60
+
+suite = Suite("gui")
+
+
+def game(seed=SEED):
+    """Returns a game that has been set up from the given seed, not yet played.
+    Its frame rate is not capped."""
+    game = Game(fps=0)
+    game.initialize_values(seed)
+    game.difficulty_modifier()
+    game.initialize_sprites()
+    return game
+
+
+@suite.add("floor.init")
+def floor_init():
+    """Builds the floor, tiling it with the tile image."""
+    image = load_asset(IMAGE, TILE)
+    return partial(Floor, game(), image, LIGHT_NULL, GRIDWIDTH, GRIDHEIGHT)
+
+
+@suite.add("floor.update")
+def floor_update():
+    """Lights up the player's tile, which is already lit, as on every frame after a move."""
+    played = game()
+    return partial(played.floor_sprite.sprite.update, played.player_sprite.sprite.rect)
+
+
+@suite.add("floor.draw")
+def floor_draw():
+    """Draws the whole floor."""
+    played = game()
+    return partial(played.floor_sprite.sprite.draw, played.screen)
+
+
+@suite.add("check_collide")
+def collide():
+    """Checks the player for collisions with Wumpus, bats and pits."""
+    played = game()
+    return partial(check_collide, played.player_sprite.sprite, played)
+
+
+@suite.add("print_dangers")
+def print_dangers():
+    """Looks for dangers next to the player."""
+    return game().player_sprite.sprite.print_dangers
+
+
+@suite.add("load_asset")
+def asset():
+    """Loads the tile image."""
+    return partial(load_asset, IMAGE, TILE)
+
+
+@suite.add("frame", kind='macro')
+def frame():
+    """Runs one frame of the main loop: input, update, render and show. As after
+    a move, the score changes and the player steps to the next tile and back."""
+    played = game()
+    player = played.player_sprite.sprite
+    step_x = TILESIZE if player.rect.x == 0 else -TILESIZE
+
+    def step():
+        played.moves += 1
+        player.rect.x += step_x if played.moves % 2 else -step_x
+        played.scheduler.mark()
+        played.input()
+        if played.scheduler.redraw():
+            played.update()
+            played.render()
+    return step
+
+
+@suite.add("frame.full", kind='macro')
+def frame_full():
+    """Draws and shows the whole game screen, as every frame did before only
+    the changed parts were drawn."""
+    played = game()
+
+    def step():
+        played.draw()
+        played.show()
+    return step
+
+
+@suite.add("frame.game_over", kind='macro')
+def frame_game_over():
+    """Draws and shows the whole game over screen, with the board revealed."""
+    played = game()
+    played.draw_all, played.alive, played.cause = True, False, "Pit"
+
+    def step():
+        played.draw()
+        played.show()
+    return step
+
+
+@suite.add("game", kind='macro')
+def replayed():
+    """Plays whole games headless, on random keys."""
+    played = Game()
+    rng = random.Random(SEED)
+
+    def step():
+        keys = [rng.choice(KEYS) for _ in range(KEYS_PER_GAME)]
+        play(played, Recording(rng.getrandbits(SEED_BITS), played.difficulty, False, 0, keys))
+    return step
+
+
+if __name__ == "__main__":
+    suite.main()
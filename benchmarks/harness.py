@@ -0,0 +1,98 @@
+"""Timing harness of the benchmark suites. A suite registers its benchmarks
+with a setup function, which builds everything from fixed seeds and returns
+the function to time, so that every run measures the same work. Each
+benchmark is timed in a number of samples, each sample running the function
+enough times to take at least MIN_TIME, as seconds per call.
+
+A suite is run as a script from the folder of its game, and prints its
+samples as JSON on standard output. Anything the game itself prints while
+it is measured is thrown away."""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+REPEAT = 15
+MIN_TIME = 0.02
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def use_game(folder):
+    """Makes the modules of the given game folder importable,
+    e.g. 'Wumpus_CLI', and returns its path."""
+    path = os.path.normpath(os.path.join(ROOT, folder))
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return path
+
+
+def measure(function, repeat=REPEAT, min_time=MIN_TIME):
+    """Returns repeat samples of the seconds per call of function. The number
+    of calls per sample is doubled until a sample takes min_time. The garbage
+    collector is off while timing, as in timeit."""
+    loops = 1
+    while True:
+        elapsed = sample(function, loops)
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    return [sample(function, loops) / loops for _ in range(repeat)]
+
+
+def sample(function, loops):
+    """Returns the seconds taken by calling function loops times."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        return time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class Suite:
+    """A named group of benchmarks. Micro benchmarks time a single function
+    of the game, macro benchmarks time whole games or frames."""
+    def __init__(self, name):
+        self.name = name
+        self.benchmarks = []
+
+    def add(self, name, kind='micro'):
+        """Decorator. Registers a setup function under the given name."""
+        def register(setup):
+            self.benchmarks.append((self.name + "." + name, kind, setup))
+            return setup
+        return register
+
+    def run(self, pattern="", repeat=REPEAT, min_time=MIN_TIME):
+        """Runs the benchmarks whose names contain the pattern.
+        Returns their kinds and samples by name."""
+        results = {}
+        for name, kind, setup in self.benchmarks:
+            if pattern in name:
+                results[name] = {'kind': kind, 'samples': measure(setup(), repeat, min_time)}
+        return results
+
+    def main(self):
+        """Reads the arguments, runs the suite and prints the results as JSON."""
+        parser = argparse.ArgumentParser(description="Runs the " + self.name + " benchmarks.")
+        parser.add_argument('-k', '--pattern', default="", help="only run benchmarks whose names contain this")
+        parser.add_argument('-r', '--repeat', type=int, default=REPEAT, help="samples per benchmark")
+        parser.add_argument('-t', '--min-time', type=float, default=MIN_TIME, help="seconds per sample")
+        args = parser.parse_args()
+
+        stdout = sys.stdout
+        with open(os.devnull, 'w') as sink:
+            sys.stdout = sink
+            try:
+                results = self.run(args.pattern, args.repeat, args.min_time)
+            finally:
+                sys.stdout = stdout
+        json.dump(results, stdout)
+        stdout.write("\n")
@@ -0,0 +1,200 @@
+"""Runs the benchmark suites of both games, each in its own interpreter started
+in the game's folder, and compares the results with the history of earlier
+runs on the same machine and Python version. A benchmark has regressed when
+its samples are slower than those of the last few runs with a Mann-Whitney U
+test, at the given significance level, and its median is slower by more than
+the threshold. Pooling a few runs keeps the noise between runs, e.g. of other
+processes, in the baseline. The results are then added to the history file, one JSON line per
+run, and the script fails if anything regressed."""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+from harness import ROOT, REPEAT, MIN_TIME
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+HISTORY = os.path.join(BENCHMARKS, "history.jsonl")
+SUITES = {
+    'cli': ("bench_cli.py", "Wumpus_CLI"),
+    'gui': ("bench_gui.py", "Wumpus_GUI"),
+}
+ALPHA = 0.01
+THRESHOLD = 0.10
+WINDOW = 3
+
+
+def run_suite(suite, pattern="", repeat=REPEAT, min_time=MIN_TIME):
+    """Runs a suite in a new interpreter. Returns its results, or
+    None and the reason if it could not be run, e.g. without pygame."""
+    script, folder = SUITES[suite]
+    environment = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    process = subprocess.run(
+        [sys.executable, os.path.join(BENCHMARKS, script), '-k', pattern, '-r', str(repeat), '-t', str(min_time)],
+        cwd=os.path.join(ROOT, folder), env=environment, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        errors = process.stderr.decode('utf-8', 'replace').strip().splitlines()
+        return None, errors[-1] if errors else "exit code " + str(process.returncode)
+    return json.loads(process.stdout.decode('utf-8')), None
+
+
+def mann_whitney(baseline, current):
+    """One-sided Mann-Whitney U test. Returns the probability of the current
+    samples being this much slower than the baseline by chance, using the
+    normal approximation with a correction for ties."""
+    n1, n2 = len(baseline), len(current)
+    values = sorted([(value, 0) for value in baseline] + [(value, 1) for value in current])
+
+    rank_sum = 0.0
+    ties = 0.0
+    i = 0
+    while i < len(values):
+        j = i
+        while j < len(values) and values[j][0] == values[i][0]:
+            j += 1
+        rank = (i + j + 1) / 2
+        rank_sum += rank * sum(group for _, group in values[i:j])
+        ties += (j - i) ** 3 - (j - i)
+        i = j
+
+    n = n1 + n2
+    u = rank_sum - n2 * (n2 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def read_history(path):
+    """Returns the earlier runs from the history file, oldest first."""
+    try:
+        with open(path, 'r') as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except IOError:
+        return []
+
+
+def baseline(history, name, against=None, window=WINDOW):
+    """Returns the samples of the named benchmark in the last runs on this machine
+    and Python version, or in the last runs of the given commit, pooled.
+    None if there are none."""
+    samples = []
+    runs = 0
+    for record in reversed(history):
+        if runs == window:
+            break
+        if name not in record['results']:
+            continue
+        if against is not None:
+            if not (record.get('commit') or "").startswith(against):
+                continue
+        elif record['host'] != platform.node() or record['python'] != platform.python_version():
+            continue
+        samples.extend(record['results'][name]['samples'])
+        runs += 1
+    return samples or None
+
+
+def compare(results, history, against=None, alpha=ALPHA, threshold=THRESHOLD, window=WINDOW):
+    """Compares every result with its baseline. Returns a row per benchmark:
+    name, kind, median, baseline median, change, p-value and verdict."""
+    rows = []
+    for name, result in sorted(results.items()):
+        median = statistics.median(result['samples'])
+        previous = baseline(history, name, against, window)
+        if previous is None:
+            rows.append((name, result['kind'], median, None, None, None, "new"))
+            continue
+        before = statistics.median(previous)
+        change = median / before - 1
+        p = mann_whitney(previous, result['samples'])
+        if p < alpha and change > threshold:
+            verdict = "REGRESSED"
+        elif mann_whitney(result['samples'], previous) < alpha and change < -threshold:
+            verdict = "improved"
+        else:
+            verdict = "ok"
+        rows.append((name, result['kind'], median, before, change, p, verdict))
+    return rows
+
+
+def commit():
+    """Returns the current git commit, or None outside of a checkout."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def show(rows):
+    """Prints the comparison as a table, times in microseconds."""
+    print("{0:<22} {1:<6} {2:>12} {3:>12} {4:>8} {5:>8}  {6}".format(
+        "benchmark", "kind", "median us", "before us", "change", "p", ""))
+    for name, kind, median, before, change, p, verdict in rows:
+        print("{0:<22} {1:<6} {2:>12.2f} {3:>12} {4:>8} {5:>8}  {6}".format(
+            name, kind, median * 1e6,
+            "-" if before is None else "{0:.2f}".format(before * 1e6),
+            "-" if change is None else "{0:+.1%}".format(change),
+            "-" if p is None else "{0:.4f}".format(p), verdict))
+
+
+def main():
+    """Reads the arguments, runs the suites, compares and records the results."""
+    parser = argparse.ArgumentParser(description="Runs the benchmarks and flags regressions.")
+    parser.add_argument('suites', nargs='*', help="suites to run, all by default: " + ", ".join(sorted(SUITES)))
+    parser.add_argument('-k', '--pattern', default="", help="only run benchmarks whose names contain this")
+    parser.add_argument('-r', '--repeat', type=int, default=REPEAT, help="samples per benchmark")
+    parser.add_argument('-t', '--min-time', type=float, default=MIN_TIME, help="seconds per sample")
+    parser.add_argument('--history', default=HISTORY, help="history file")
+    parser.add_argument('--against', help="compare with the last runs of this commit instead")
+    parser.add_argument('-w', '--window', type=int, default=WINDOW, help="earlier runs pooled as the baseline")
+    parser.add_argument('--alpha', type=float, default=ALPHA, help="significance level")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="slowdown of the median to flag")
+    parser.add_argument('--no-save', action='store_true', help="do not add this run to the history")
+    parser.add_argument('-o', '--output', help="also write the results as JSON to this file")
+    args = parser.parse_args()
+    for suite in args.suites:
+        if suite not in SUITES:
+            parser.error("unknown suite: " + suite)
+
+    results = {}
+    for suite in args.suites or sorted(SUITES):
+        suite_results, reason = run_suite(suite, args.pattern, args.repeat, args.min_time)
+        if suite_results is None:
+            print("Skipped the {0} suite: {1}".format(suite, reason))
+            continue
+        results.update(suite_results)
+
+    history = read_history(args.history)
+    rows = compare(results, history, args.against, args.alpha, args.threshold, args.window)
+    show(rows)
+
+    record = {
+        'time': datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': commit(),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    if results and not args.no_save:
+        with open(args.history, 'a') as file:
+            file.write(json.dumps(record) + "\n")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(record, file, indent=2)
+
+    regressed = [row[0] for row in rows if row[-1] == "REGRESSED"]
+    print("REGRESSED: " + ", ".join(regressed) if regressed else "OK")
+    raise SystemExit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""CLI startup benchmark. Starts fresh interpreters and measures how long importing
+the game takes and how long it takes until the menu asks for its first choice,
+both with the bare interpreter start subtracted. Fails if a median is over
+its budget, so that slow imports are caught before they are released."""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CLI_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Wumpus_CLI")
+PROMPT = b"Val: "
+RUNS = 20
+
+# Budgets in milliseconds, over the bare interpreter start.
+IMPORT_BUDGET = 60.0
+PROMPT_BUDGET = 80.0
+
+
+def time_command(arguments):
+    """Runs a Python command in the CLI folder and returns its wall time in ms."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + arguments, cwd=CLI_FOLDER, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def time_prompt():
+    """Starts the game and returns the time in ms until the menu prompt is shown."""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-u", "main.py"], cwd=CLI_FOLDER,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b""
+    try:
+        while not output.endswith(PROMPT):
+            data = os.read(process.stdout.fileno(), 4096)
+            if not data:
+                raise RuntimeError("The game ended before asking for input.")
+            output += data
+        return (time.perf_counter() - start) * 1000
+    finally:
+        process.kill()
+        process.wait()
+        process.stdin.close()
+        process.stdout.close()
+
+
+def measure(runs=RUNS):
+    """Measures every phase the given number of times, after one warm-up run
+    that also builds the precompiled catalog. Returns the medians and 90th
+    percentiles in ms."""
+    time_prompt()
+    samples = {'interpreter': [], 'import': [], 'prompt': []}
+    for _ in range(runs):
+        samples['interpreter'].append(time_command(["-c", "pass"]))
+        samples['import'].append(time_command(["-c", "import main"]))
+        samples['prompt'].append(time_prompt())
+
+    base = statistics.median(samples['interpreter'])
+    report = {'runs': runs, 'python': sys.version.split()[0]}
+    for phase, values in samples.items():
+        values.sort()
+        offset = 0.0 if phase == 'interpreter' else base
+        report[phase] = {
+            'median_ms': round(statistics.median(values) - offset, 2),
+            'p90_ms': round(values[int(0.9 * (len(values) - 1))] - offset, 2),
+        }
+    return report
+
+
+def main():
+    """Reads the arguments, runs the benchmark and checks the budgets."""
+    parser = argparse.ArgumentParser(description="Measures CLI import and first-prompt latency.")
+    parser.add_argument('-n', '--runs', type=int, default=RUNS, help="runs per phase")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET, help="ms allowed for imports")
+    parser.add_argument('--prompt-budget', type=float, default=PROMPT_BUDGET, help="ms allowed until the menu")
+    parser.add_argument('-o', '--output', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = measure(args.runs)
+    print("Interpreter start: {median_ms} ms (p90 {p90_ms} ms)".format(**report['interpreter']))
+    print("Import of main:    {median_ms} ms (p90 {p90_ms} ms), budget {0} ms".format(
+        args.import_budget, **report['import']))
+    print("First prompt:      {median_ms} ms (p90 {p90_ms} ms), budget {0} ms".format(
+        args.prompt_budget, **report['prompt']))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    over = report['import']['median_ms'] > args.import_budget or report['prompt']['median_ms'] > args.prompt_budget
+    print("OVER BUDGET" if over else "OK")
+    raise SystemExit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()